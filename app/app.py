@@ -3,21 +3,27 @@ Authelia User Management GUI - Main Application
 
 FastAPI application with security middleware, user management, and audit logging.
 """
+import asyncio
 import logging
 import json
-import secrets
+import os
+import orjson
+import re
+import string
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
-from fastapi import FastAPI, Request, Form, HTTPException, Query
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi import BackgroundTasks, FastAPI, Request, Form, HTTPException, Query
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 from passlib.hash import bcrypt
 from pydantic import ValidationError
 
 from config import get_settings
 from security import SecurityMiddleware
 from users_io import UsersFileHandler, validate_no_duplicate_emails
-from restart import apply_changes, restart_authelia
+from restart import apply_changes, close_health_client, restart_authelia
 from audit import AuditLogger
 from models import CreateUserRequest, UserListItem
 from authelia_config import detect_watch_mode
@@ -37,7 +43,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Authelia User Management",
     description="Production-grade GUI for managing Authelia file provider users",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add security middleware
@@ -46,13 +53,51 @@ app.add_middleware(SecurityMiddleware, settings=settings)
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Setup templates
+# Setup templates (bytecode cache survives restarts; hot templates compiled once)
 templates = Jinja2Templates(directory="templates")
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+INDEX_TEMPLATE = templates.env.get_template("index.html")
+ERROR_TEMPLATE = templates.env.get_template("error.html")
 
 # Initialize handlers
 users_handler = UsersFileHandler(settings)
 audit_logger = AuditLogger(settings)
 
+# users.yml writes (backup, write, fsync, rename, prune) run in a worker thread;
+# the lock keeps read-modify-write cycles from interleaving
+USERS_WRITE_LOCK = asyncio.Lock()
+
+# Process pool for CPU-bound password hashing (keeps the event loop responsive)
+HASH_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+# Pre-warm passlib's lazy bcrypt backend selection (minimum cost; workers fork warm)
+bcrypt.using(rounds=4).hash("warmup")
+
+
+@app.on_event("startup")
+async def start_audit_flusher():
+    """Start batching audit writes in the background."""
+    audit_logger.start()
+
+
+@app.on_event("shutdown")
+async def stop_audit_flusher():
+    """Flush any buffered audit events before exit."""
+    await audit_logger.stop()
+    audit_logger.close()
+
+
+@app.on_event("shutdown")
+async def shutdown_health_client():
+    """Close keep-alive connections to the Authelia health endpoint."""
+    await close_health_client()
+
+
+@app.on_event("shutdown")
+async def shutdown_hash_pool():
+    """Release hashing worker processes on shutdown."""
+    HASH_POOL.shutdown(wait=False, cancel_futures=True)
+
 
 @app.get("/health")
 async def health_check():
@@ -117,28 +162,25 @@ async def dashboard(
         # Load all users
         users_dict = users_handler.list_users()
 
-        # Convert to list format
-        users_list = []
-        for username, user_config in users_dict.items():
-            user_item = UserListItem(
+        # Convert to list format, applying the search filter in the same pass
+        # Case-insensitive match without allocating lowercased copies per user
+        search_pattern = re.compile(re.escape(search), re.IGNORECASE) if search else None
+        users_list = [
+            UserListItem(
                 username=username,
                 email=user_config.email,
                 displayname=user_config.displayname,
                 groups=user_config.groups,
                 has_totp=False  # TODO: Read from database if available
             )
-            users_list.append(user_item)
-
-        # Apply search filter if provided
-        if search:
-            search_lower = search.lower()
-            users_list = [
-                u for u in users_list
-                if search_lower in u.username.lower() or search_lower in u.email.lower()
-            ]
+            for username, user_config in users_dict.items()
+            if search_pattern is None
+            or search_pattern.search(username)
+            or search_pattern.search(user_config.email)
+        ]
 
         # Get CSRF token from request state (set by middleware)
-        csrf_token = getattr(request.state, 'csrf_token', '')
+        csrf_token = request.state.csrf_token
 
         # Detect watch mode status
         try:
@@ -146,36 +188,32 @@ async def dashboard(
         except:
             watch_mode_enabled = False
 
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "users": users_list,
-                "total_users": len(users_dict),
-                "filtered_users": len(users_list),
-                "search_query": search or "",
-                "csrf_token": csrf_token,
-                "admin_group": settings.admin_group,
-                "watch_mode_enabled": watch_mode_enabled,
-                "force_restart": settings.force_restart
-            }
-        )
+        return HTMLResponse(INDEX_TEMPLATE.render({
+            "request": request,
+            "users": users_list,
+            "total_users": len(users_dict),
+            "filtered_users": len(users_list),
+            "search_query": search or "",
+            "csrf_token": csrf_token,
+            "admin_group": settings.admin_group,
+            "watch_mode_enabled": watch_mode_enabled,
+            "force_restart": settings.force_restart
+        }))
 
     except Exception as e:
         logger.error(f"Error loading dashboard: {e}", exc_info=True)
-        return templates.TemplateResponse(
-            "error.html",
-            {
+        return HTMLResponse(
+            ERROR_TEMPLATE.render({
                 "request": request,
                 "error": "Failed to load dashboard",
                 "details": str(e)
-            },
+            }),
             status_code=500
         )
 
 
 @app.post("/users")
-async def create_user(request: Request):
+async def create_user(request: Request, background: BackgroundTasks):
     """
     Create a new user.
 
@@ -183,6 +221,8 @@ async def create_user(request: Request):
     - RBAC: Admin group in X-Forwarded-Groups
     - CSRF: Valid token in X-CSRF-Token header
 
+    Old backups are pruned after the response is sent.
+
     Returns:
         JSON response with success/error
     """
@@ -217,26 +257,32 @@ async def create_user(request: Request):
                 groups=groups
             )
         except ValidationError as e:
-            return JSONResponse(
+            return ORJSONResponse(
                 {"error": "Validation failed", "details": e.errors()},
                 status_code=400
             )
 
-        # Hash password using bcrypt
-        password_hash = bcrypt.hash(password)
+        # Hash password using bcrypt (off the event loop)
+        password_hash = await asyncio.get_running_loop().run_in_executor(
+            HASH_POOL, hash_password, password, settings.bcrypt_rounds
+        )
         hash_prefix = password_hash[:12]  # For audit log
 
         # Add user
         try:
-            users_handler.add_user(
-                username=user_request.username,
-                email=user_request.email,
-                displayname=user_request.displayname,
-                password_hash=password_hash,
-                groups=user_request.groups
-            )
+            async with USERS_WRITE_LOCK:
+                await asyncio.to_thread(
+                    users_handler.add_user,
+                    username=user_request.username,
+                    email=user_request.email,
+                    displayname=user_request.displayname,
+                    password_hash=password_hash,
+                    groups=user_request.groups,
+                    prune=False
+                )
+            background.add_task(users_handler.prune_backups)
         except ValueError as e:
-            return JSONResponse(
+            return ORJSONResponse(
                 {"error": str(e)},
                 status_code=409
             )
@@ -269,18 +315,18 @@ async def create_user(request: Request):
         if password_generated:
             response_data["generated_password"] = password
 
-        return JSONResponse(response_data)
+        return ORJSONResponse(response_data)
 
     except Exception as e:
         logger.error(f"Error creating user: {e}", exc_info=True)
-        return JSONResponse(
+        return ORJSONResponse(
             {"error": "Failed to create user", "details": str(e)},
             status_code=500
         )
 
 
 @app.delete("/users/{username}")
-async def delete_user(request: Request, username: str):
+async def delete_user(request: Request, username: str, background: BackgroundTasks):
     """
     Delete a user.
 
@@ -288,6 +334,8 @@ async def delete_user(request: Request, username: str):
     - RBAC: Admin group in X-Forwarded-Groups
     - CSRF: Valid token in X-CSRF-Token header
 
+    Old backups are pruned after the response is sent.
+
     Args:
         username: Username to delete
 
@@ -297,15 +345,17 @@ async def delete_user(request: Request, username: str):
     try:
         # Delete user (includes last-admin protection)
         try:
-            users_handler.delete_user(username)
+            async with USERS_WRITE_LOCK:
+                await asyncio.to_thread(users_handler.delete_user, username, prune=False)
+            background.add_task(users_handler.prune_backups)
         except ValueError as e:
             # Check if it's the last admin error
             if "last admin" in str(e).lower():
-                return JSONResponse(
+                return ORJSONResponse(
                     {"error": str(e)},
                     status_code=409
                 )
-            return JSONResponse(
+            return ORJSONResponse(
                 {"error": str(e)},
                 status_code=404
             )
@@ -321,7 +371,7 @@ async def delete_user(request: Request, username: str):
         logger.info(f"Applying changes after deleting user '{username}'")
         restart_success, restart_message = await apply_changes(settings, username)
 
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True,
             "message": f"User '{username}' deleted successfully",
             "restart_status": {
@@ -332,13 +382,13 @@ async def delete_user(request: Request, username: str):
 
     except Exception as e:
         logger.error(f"Error deleting user {username}: {e}", exc_info=True)
-        return JSONResponse(
+        return ORJSONResponse(
             {"error": "Failed to delete user", "details": str(e)},
             status_code=500
         )
 
 
-@app.get("/audit", response_class=JSONResponse)
+@app.get("/audit", response_class=StreamingResponse)
 async def get_audit_logs(
     request: Request,
     limit: int = Query(100, ge=1, le=1000),
@@ -347,46 +397,85 @@ async def get_audit_logs(
     """
     Get audit logs (admin only).
 
+    The total and the first chunk are read before the response starts, so
+    a failing read still returns a 500. A failure on a later chunk aborts
+    the stream (the body is left incomplete) rather than ending the page
+    early with the full total.
+
     Query params:
         limit: Number of entries to return (max 1000)
         offset: Number of entries to skip (for pagination)
 
     Returns:
-        JSON with audit log entries
+        JSON with audit log entries (streamed in chunks)
     """
     try:
-        logs = audit_logger.get_recent_logs(limit=limit, offset=offset)
-        total = audit_logger.get_total_count()
-
-        return JSONResponse({
-            "logs": logs,
-            "total": total,
-            "limit": limit,
-            "offset": offset
-        })
+        # total is read together with the first chunk, so both match
+        total, chunks = await asyncio.to_thread(
+            audit_logger.iter_recent_logs, limit=limit, offset=offset
+        )
 
     except Exception as e:
         logger.error(f"Error fetching audit logs: {e}", exc_info=True)
-        return JSONResponse(
+        return ORJSONResponse(
             {"error": "Failed to fetch audit logs", "details": str(e)},
             status_code=500
         )
 
+    def stream_logs():
+        yield b'{"logs":['
+        first = True
+        for chunk in chunks:
+            body = b','.join(orjson.dumps(entry) for entry in chunk)
+            yield body if first else b',' + body
+            first = False
+        yield b'],"total":%d,"limit":%d,"offset":%d}' % (total, limit, offset)
+
+    return StreamingResponse(stream_logs(), media_type="application/json")
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """
+    Hash a password with bcrypt at the given cost factor.
+
+    Module-level so it can be pickled into HASH_POOL workers.
+
+    Args:
+        password: Plaintext password
+        rounds: Bcrypt cost factor
+
+    Returns:
+        Bcrypt password hash
+    """
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+_PASSWORD_ALPHABET = (string.ascii_letters + string.digits + "!@#$%^&*()-_=+").encode('ascii')
+_PASSWORD_MASK = 127  # Smallest 2**n - 1 covering every alphabet index
+
 
 def generate_secure_password(length: int = 16) -> str:
     """
     Generate a secure random password.
 
+    Draws random bytes in bulk and rejection-samples them into the
+    alphabet, so every character is equally likely.
+
     Args:
         length: Password length
 
     Returns:
         Random password string
     """
-    import string
-    alphabet = string.ascii_letters + string.digits + "!@#$%^&*()-_=+"
-    password = ''.join(secrets.choice(alphabet) for _ in range(length))
-    return password
+    password = bytearray()
+    while len(password) < length:
+        for b in os.urandom(length * 2):
+            i = b & _PASSWORD_MASK
+            if i < len(_PASSWORD_ALPHABET):
+                password.append(_PASSWORD_ALPHABET[i])
+                if len(password) == length:
+                    break
+    return password.decode('ascii')
 
 
 if __name__ == "__main__":
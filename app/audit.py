@@ -2,24 +2,71 @@
 Audit logging for user management operations.
 
 Stores audit records in SQLite database with:
-- Timestamp
+- Timestamp (integer nanoseconds since epoch, UTC)
 - Actor (username)
 - Action (CREATE/DELETE)
 - Target (username affected)
 - Details (JSON metadata, no secrets)
 - IP address
+
+Events are buffered in memory and written in batches by a background
+flusher task (see AuditLogger.start/stop).
 """
+import asyncio
 import sqlite3
-import json
-from datetime import datetime
+import orjson
+import threading
+import time
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 import logging
 
 from config import Settings
 
 logger = logging.getLogger(__name__)
 
+AuditRow = Tuple[int, str, str, str, str, str]
+
+# The write buffer holds at most this many batches (of audit_buffer_size
+# events) before callers have to write synchronously
+_QUEUE_BATCHES = 4
+
+_CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS audit_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp INTEGER NOT NULL,
+        actor TEXT NOT NULL,
+        action TEXT NOT NULL,
+        target TEXT NOT NULL,
+        details TEXT,
+        ip TEXT
+    )
+"""
+
+# Statement text is the key for sqlite3's per-connection prepared-statement
+# cache, so hot statements are kept as constants and reused verbatim.
+_INSERT_SQL = """
+    INSERT INTO audit_log (timestamp, actor, action, target, details, ip)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# Newest first; id breaks timestamp ties so the order is total
+_RECENT_SQL = """
+    SELECT id, timestamp, actor, action, target, details, ip
+    FROM audit_log
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ? OFFSET ?
+"""
+
+# Keyset continuation of _RECENT_SQL: the rows after (timestamp, id)
+_RECENT_AFTER_SQL = """
+    SELECT id, timestamp, actor, action, target, details, ip
+    FROM audit_log
+    WHERE (timestamp, id) < (?, ?)
+    ORDER BY timestamp DESC, id DESC
+    LIMIT ?
+"""
+
 
 class AuditLogger:
     """Handler for audit log database operations."""
@@ -37,33 +84,130 @@ class AuditLogger:
         # Ensure parent directory exists
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
+        # Single shared connection (WAL); the lock serializes access across threads
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        # Row count maintained in-process (loaded once, bumped on insert)
+        self._row_count = 0
+
+        # Write buffer (None until start() is called; writes are synchronous until then)
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+
         # Initialize database
         self._init_database()
 
+    def start(self) -> None:
+        """
+        Start the background flusher.
+
+        Must be called from within a running event loop (e.g. app startup).
+        """
+        if self._flusher_task is not None:
+            return
+        self._queue = asyncio.Queue(
+            maxsize=self.settings.audit_buffer_size * _QUEUE_BATCHES
+        )
+        self._flusher_task = asyncio.create_task(self._flusher())
+
+    async def stop(self) -> None:
+        """Flush buffered events and stop the background flusher."""
+        if self._flusher_task is None:
+            return
+        # None is the stop sentinel: the flusher writes what it has and exits
+        await self._queue.put(None)
+        await self._flusher_task
+        self._flusher_task = None
+        self._queue = None
+
+    def close(self) -> None:
+        """Close the shared database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def _flusher(self) -> None:
+        """Drain the buffer into batched INSERTs."""
+        loop = asyncio.get_running_loop()
+        interval = self.settings.audit_flush_interval_ms / 1000
+        stopping = False
+
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+
+            # Collect more rows until the buffer is full or the interval elapses
+            deadline = loop.time() + interval
+            while len(batch) < self.settings.audit_buffer_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await asyncio.to_thread(self._write_batch, batch)
+
+    def _write_batch(self, rows: List[AuditRow]) -> None:
+        """
+        Write a batch of audit rows in a single transaction.
+
+        Args:
+            rows: Tuples of (timestamp, actor, action, target, details, ip)
+        """
+        try:
+            with self._lock:
+                self._conn.executemany(_INSERT_SQL, rows)
+                self._conn.commit()
+                self._row_count += len(rows)
+
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write {len(rows)} audit log entries: {e}")
+            # Don't raise - audit failure shouldn't block operations
+
     def _init_database(self) -> None:
-        """Create audit log table if it doesn't exist."""
+        """Open the shared connection and create audit log table if it doesn't exist."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                cached_statements=128
+            )
+
+            # WAL + synchronous=NORMAL: commits don't fsync, WAL replay keeps them durable
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA mmap_size=268435456")
+
             cursor = conn.cursor()
 
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS audit_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    actor TEXT NOT NULL,
-                    action TEXT NOT NULL,
-                    target TEXT NOT NULL,
-                    details TEXT,
-                    ip TEXT
-                )
-            """)
+            self._migrate_text_timestamps(cursor)
+            cursor.execute(_CREATE_TABLE_SQL)
 
-            # Create indexes for common queries
+            # Create indexes for common queries.
+            # idx_timestamp_id matches the (timestamp DESC, id DESC) listing
+            # order and keyset, so recent-log pages walk it without a sort
+            # and look up only the rows they return. It is kept narrow:
+            # every audit insert pays for each indexed column. It supersedes
+            # the old idx_timestamp and the wider idx_recent.
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_timestamp
-                ON audit_log(timestamp DESC)
+                CREATE INDEX IF NOT EXISTS idx_timestamp_id
+                ON audit_log(timestamp DESC, id DESC)
             """)
 
+            cursor.execute("DROP INDEX IF EXISTS idx_timestamp")
+            cursor.execute("DROP INDEX IF EXISTS idx_recent")
+
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_actor
                 ON audit_log(actor)
@@ -75,7 +219,9 @@ class AuditLogger:
             """)
 
             conn.commit()
-            conn.close()
+
+            self._row_count = cursor.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0]
+            self._conn = conn
 
             logger.info(f"Audit database initialized: {self.db_path}")
 
@@ -83,6 +229,30 @@ class AuditLogger:
             logger.error(f"Failed to initialize audit database: {e}")
             raise
 
+    def _migrate_text_timestamps(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Convert a legacy ISO-8601 TEXT timestamp column to integer nanoseconds.
+
+        Args:
+            cursor: Cursor on the audit database
+        """
+        columns = {row[1]: row[2] for row in cursor.execute("PRAGMA table_info(audit_log)")}
+        if columns.get('timestamp', '').upper() != 'TEXT':
+            return
+
+        logger.info("Migrating audit_log timestamps to integer nanoseconds")
+
+        # Rebuild the table; dropping the old one also drops its indexes
+        cursor.execute("ALTER TABLE audit_log RENAME TO audit_log_old")
+        cursor.execute(_CREATE_TABLE_SQL)
+        cursor.execute("""
+            INSERT INTO audit_log (id, timestamp, actor, action, target, details, ip)
+            SELECT id, CAST(strftime('%s', timestamp) AS INTEGER) * 1000000000,
+                   actor, action, target, details, ip
+            FROM audit_log_old
+        """)
+        cursor.execute("DROP TABLE audit_log_old")
+
     def log_create_user(
         self,
         actor: str,
@@ -148,7 +318,12 @@ class AuditLogger:
         ip: str
     ) -> None:
         """
-        Log an audit event to database.
+        Log an audit event.
+
+        The event is queued for the background flusher when it is running,
+        otherwise it is written immediately. A full buffer (the writer has
+        stalled) also makes the caller write immediately: that is the
+        backpressure, and no event is dropped.
 
         Args:
             actor: Username performing action
@@ -157,85 +332,136 @@ class AuditLogger:
             details: Additional details as dict
             ip: IP address
         """
+        row = (time.time_ns(), actor, action, target, orjson.dumps(details).decode(), ip)
+
+        if self._queue is None:
+            self._write_batch([row])
+        else:
+            try:
+                self._queue.put_nowait(row)
+            except asyncio.QueueFull:
+                logger.warning("Audit buffer full, writing event synchronously")
+                self._write_batch([row])
+
+        logger.info(
+            f"Audit log: {action} user '{target}' by '{actor}' from {ip}",
+            extra={
+                'actor': actor,
+                'action': action,
+                'target': target,
+                'ip': ip
+            }
+        )
+
+    def get_recent_logs(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Get recent audit log entries.
+
+        Args:
+            limit: Maximum number of entries to return
+            offset: Number of entries to skip (for pagination)
+
+        Returns:
+            List of audit log entries as dicts ('details' is a pre-encoded
+            orjson.Fragment that is passed through as-is when serialized)
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
 
-            timestamp = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-            details_json = json.dumps(details)
+                cursor.execute(_RECENT_SQL, (limit, offset))
 
-            cursor.execute(
-                """
-                INSERT INTO audit_log (timestamp, actor, action, target, details, ip)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (timestamp, actor, action, target, details_json, ip)
-            )
+                rows = cursor.fetchall()
 
-            conn.commit()
-            conn.close()
-
-            logger.info(
-                f"Audit log: {action} user '{target}' by '{actor}' from {ip}",
-                extra={
-                    'actor': actor,
-                    'action': action,
-                    'target': target,
-                    'ip': ip
-                }
-            )
+            return [_row_to_entry(row) for row in rows]
 
         except sqlite3.Error as e:
-            logger.error(f"Failed to write audit log: {e}")
-            # Don't raise - audit failure shouldn't block operations
+            logger.error(f"Failed to read audit logs: {e}")
+            return []
 
-    def get_recent_logs(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    def iter_recent_logs(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        chunk_size: int = 64
+    ) -> Tuple[int, Iterator[List[Dict[str, Any]]]]:
         """
-        Get recent audit log entries.
+        Read recent audit log entries in chunks, plus the matching total.
+
+        The first chunk is located with OFFSET; every later chunk continues
+        from the last row sent with a keyset query on (timestamp, id).
+        Rows flushed in between are newer than the first chunk, so they
+        neither shift later chunks nor show up twice. The total is read
+        under the same lock as the first chunk, so it describes the same
+        state of the table. The shared connection is not held between
+        chunks and memory stays bounded by chunk_size.
 
         Args:
-            limit: Maximum number of entries to return
+            limit: Maximum number of entries to yield in total
             offset: Number of entries to skip (for pagination)
+            chunk_size: Entries fetched per query
 
         Returns:
-            List of audit log entries as dicts
+            Tuple of (total entry count, iterator over lists of audit log
+            entries as dicts; see get_recent_logs)
+
+        Raises:
+            sqlite3.Error: If the first chunk cannot be read. Later chunks
+                raise from the iterator, so a page is never silently cut
+                short while still reporting the full total.
         """
+        size = min(chunk_size, limit)
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            with self._lock:
+                total = self._row_count
+                rows = self._conn.execute(_RECENT_SQL, (size, offset)).fetchall()
 
-            cursor.execute(
-                """
-                SELECT id, timestamp, actor, action, target, details, ip
-                FROM audit_log
-                ORDER BY timestamp DESC
-                LIMIT ? OFFSET ?
-                """,
-                (limit, offset)
-            )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read audit logs: {e}")
+            raise
 
-            rows = cursor.fetchall()
-            conn.close()
+        return total, self._iter_chunks(rows, size, limit, chunk_size)
 
-            logs = []
-            for row in rows:
-                log_entry = {
-                    'id': row['id'],
-                    'timestamp': row['timestamp'],
-                    'actor': row['actor'],
-                    'action': row['action'],
-                    'target': row['target'],
-                    'details': json.loads(row['details']) if row['details'] else {},
-                    'ip': row['ip']
-                }
-                logs.append(log_entry)
+    def _iter_chunks(
+        self,
+        rows: List[tuple],
+        size: int,
+        limit: int,
+        chunk_size: int
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield the first chunk, then fetch the rest by keyset.
 
-            return logs
+        Args:
+            rows: Rows of the first chunk
+            size: Number of rows the first chunk asked for
+            limit: Maximum number of entries to yield in total
+            chunk_size: Entries fetched per query
 
-        except sqlite3.Error as e:
-            logger.error(f"Failed to read audit logs: {e}")
-            return []
+        Yields:
+            Lists of audit log entries as dicts
+
+        Raises:
+            sqlite3.Error: If a later chunk cannot be read
+        """
+        sent = 0
+        while rows:
+            yield [_row_to_entry(row) for row in rows]
+            sent += len(rows)
+            if sent >= limit or len(rows) < size:
+                return
+
+            last_id, last_ts = rows[-1][0], rows[-1][1]
+            size = min(chunk_size, limit - sent)
+            try:
+                with self._lock:
+                    rows = self._conn.execute(
+                        _RECENT_AFTER_SQL, (last_ts, last_id, size)
+                    ).fetchall()
+
+            except sqlite3.Error as e:
+                logger.error(f"Failed to read audit logs after {sent} entries: {e}")
+                raise
 
     def get_logs_for_user(self, username: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
@@ -246,41 +472,27 @@ class AuditLogger:
             limit: Maximum number of entries to return
 
         Returns:
-            List of audit log entries as dicts
+            List of audit log entries as dicts ('details' is a pre-encoded
+            orjson.Fragment that is passed through as-is when serialized)
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                SELECT id, timestamp, actor, action, target, details, ip
-                FROM audit_log
-                WHERE actor = ? OR target = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-                """,
-                (username, username, limit)
-            )
-
-            rows = cursor.fetchall()
-            conn.close()
+            with self._lock:
+                cursor = self._conn.cursor()
+
+                cursor.execute(
+                    """
+                    SELECT id, timestamp, actor, action, target, details, ip
+                    FROM audit_log
+                    WHERE actor = ? OR target = ?
+                    ORDER BY timestamp DESC
+                    LIMIT ?
+                    """,
+                    (username, username, limit)
+                )
 
-            logs = []
-            for row in rows:
-                log_entry = {
-                    'id': row['id'],
-                    'timestamp': row['timestamp'],
-                    'actor': row['actor'],
-                    'action': row['action'],
-                    'target': row['target'],
-                    'details': json.loads(row['details']) if row['details'] else {},
-                    'ip': row['ip']
-                }
-                logs.append(log_entry)
+                rows = cursor.fetchall()
 
-            return logs
+            return [_row_to_entry(row) for row in rows]
 
         except sqlite3.Error as e:
             logger.error(f"Failed to read audit logs for user {username}: {e}")
@@ -290,19 +502,34 @@ class AuditLogger:
         """
         Get total number of audit log entries.
 
+        Served from the in-process counter; no table scan.
+
         Returns:
             Count of audit log entries
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT COUNT(*) FROM audit_log")
-            count = cursor.fetchone()[0]
-
-            conn.close()
-            return count
-
-        except sqlite3.Error as e:
-            logger.error(f"Failed to get audit log count: {e}")
-            return 0
+        return self._row_count
+
+
+def _row_to_entry(row: tuple) -> Dict[str, Any]:
+    """
+    Convert an audit_log row tuple to an entry dict.
+
+    The stored details JSON is wrapped in an orjson.Fragment instead of
+    being decoded, so it is never parsed and re-encoded on the read path.
+    The integer timestamp is rendered in the ISO-8601 form the API exposes.
+
+    Args:
+        row: (id, timestamp, actor, action, target, details, ip)
+
+    Returns:
+        Audit log entry dict
+    """
+    return {
+        'id': row[0],
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(row[1] // 1_000_000_000)),
+        'actor': row[2],
+        'action': row[3],
+        'target': row[4],
+        'details': orjson.Fragment(row[5] or '{}'),
+        'ip': row[6]
+    }
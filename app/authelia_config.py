@@ -1,13 +1,68 @@
 """
 Authelia configuration.yml parser for watch mode detection.
+
+Parsed configuration is cached per (path, mtime, size), so repeated
+lookups only re-parse the file after it changes on disk.
 """
+import functools
+import os
 import yaml
 from pathlib import Path
 from typing import Optional, Dict, Any
 import logging
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader
+
 logger = logging.getLogger(__name__)
 
+# A config that never mentions this key cannot enable watch mode
+_WATCH_KEY = b'watch'
+
+
+@functools.lru_cache(maxsize=8)
+def _read_config_cached(path: str, mtime_ns: int, size: int) -> bytes:
+    """
+    Read a configuration file, memoized on its stat signature.
+
+    Shared by the watch-key byte scan and the YAML parse, so each version
+    of the file is read from disk once.
+
+    Args:
+        path: Path to configuration file
+        mtime_ns: File modification time (cache key only)
+        size: File size in bytes (cache key only)
+
+    Returns:
+        Raw file contents
+    """
+    return Path(path).read_bytes()
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(path: str, mtime_ns: int, size: int) -> Optional[Dict[str, Any]]:
+    """
+    Parse a configuration file, memoized on its stat signature.
+
+    Callers must treat the returned dict as read-only (it is shared).
+
+    Args:
+        path: Path to configuration file
+        mtime_ns: File modification time (cache key only)
+        size: File size in bytes (cache key only)
+
+    Returns:
+        Parsed YAML data
+    """
+    # Parse the buffer: the C loader decodes UTF-8 itself and does not
+    # have to pull the document through a file object
+    data = yaml.load(_read_config_cached(path, mtime_ns, size), Loader=SafeLoader)
+
+    logger.info(f"Loaded Authelia config from {path}")
+    return data
+
 
 class AutheliaConfigParser:
     """Parser for Authelia configuration.yml to detect watch mode."""
@@ -30,15 +85,16 @@ class AutheliaConfigParser:
         Returns:
             True if loaded successfully, False otherwise
         """
-        if not self.config_path.exists():
+        try:
+            stat = self.config_path.stat()
+        except FileNotFoundError:
             logger.warning(f"Authelia config file not found: {self.config_path}")
             return False
 
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                self._config_data = yaml.safe_load(f)
-
-            logger.info(f"Loaded Authelia config from {self.config_path}")
+            self._config_data = _load_config_cached(
+                str(self.config_path), stat.st_mtime_ns, stat.st_size
+            )
             return True
 
         except yaml.YAMLError as e:
@@ -61,6 +117,20 @@ class AutheliaConfigParser:
 
         # Load config if not already loaded
         if self._config_data is None:
+            # Byte scan first: most configs without watch mode never
+            # mention the key, and then the YAML parse can be skipped
+            try:
+                stat = self.config_path.stat()
+                raw = _read_config_cached(
+                    str(self.config_path), stat.st_mtime_ns, stat.st_size
+                )
+            except OSError:
+                raw = None  # load_config reports it
+            if raw is not None and _WATCH_KEY not in raw:
+                logger.debug("No watch key in Authelia config")
+                self._watch_mode = False
+                return False
+
             if not self.load_config():
                 self._watch_mode = False
                 return False
@@ -130,23 +200,53 @@ class AutheliaConfigParser:
         """
         Force reload of configuration file.
 
+        Drops the shared parse cache too, so the file is re-read even if
+        its mtime and size did not change.
+
         Returns:
             True if reloaded successfully
         """
         self._config_data = None
         self._watch_mode = None
+        _read_config_cached.cache_clear()
+        _load_config_cached.cache_clear()
+        _detect_watch_mode_cached.cache_clear()
         return self.load_config()
 
 
+@functools.lru_cache(maxsize=8)
+def _detect_watch_mode_cached(config_path: str, mtime_ns: int, size: int) -> bool:
+    """
+    Detect watch mode, memoized on the file's stat signature.
+
+    Args:
+        config_path: Path to Authelia configuration.yml
+        mtime_ns: File modification time (cache key only)
+        size: File size in bytes (cache key only)
+
+    Returns:
+        True if watch mode is enabled, False otherwise
+    """
+    return AutheliaConfigParser(config_path).is_watch_mode_enabled()
+
+
 def detect_watch_mode(config_path: str) -> bool:
     """
     Simple helper function to detect watch mode.
 
+    The result is memoized per path until the file's mtime or size
+    changes, so repeated calls cost a single stat().
+
     Args:
         config_path: Path to Authelia configuration.yml
 
     Returns:
         True if watch mode is enabled, False otherwise
     """
-    parser = AutheliaConfigParser(config_path)
-    return parser.is_watch_mode_enabled()
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        # Missing file: let the parser log it and report disabled
+        return AutheliaConfigParser(config_path).is_watch_mode_enabled()
+
+    return _detect_watch_mode_cached(config_path, stat.st_mtime_ns, stat.st_size)
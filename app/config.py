@@ -5,14 +5,17 @@ Reads environment variables at startup with sensible defaults.
 All settings are immutable after initialization.
 
 Note: Using Pydantic v2 with v1 compatibility mode (@validator, Config class).
+Environment variables are read by pydantic-settings: each field maps to the
+upper-cased variable of the same name (e.g. backup_keep -> BACKUP_KEEP).
 """
-import os
+import functools
 import secrets
-from typing import Optional
-from pydantic import BaseModel, Field, validator
+from typing import FrozenSet, Optional
+from pydantic import Field, PrivateAttr, validator
+from pydantic_settings import BaseSettings
 
 
-class Settings(BaseModel):
+class Settings(BaseSettings):
     """Application configuration from environment variables."""
 
     # Server
@@ -35,6 +38,14 @@ class Settings(BaseModel):
         default='/data/audits.db',
         env='AUDIT_DB_PATH'
     )
+    audit_buffer_size: int = Field(
+        default=64,
+        env='AUDIT_BUFFER_SIZE'
+    )
+    audit_flush_interval_ms: int = Field(
+        default=200,
+        env='AUDIT_FLUSH_INTERVAL_MS'
+    )
 
     # Authelia integration
     authelia_container: str = Field(
@@ -65,6 +76,10 @@ class Settings(BaseModel):
         default=10,
         env='WATCH_MODE_TIMEOUT'
     )
+    authelia_cli_hashing: bool = Field(
+        default=False,
+        env='AUTHELIA_CLI_HASHING'
+    )
 
     # Security
     session_ttl_minutes: int = Field(
@@ -79,6 +94,23 @@ class Settings(BaseModel):
         default_factory=lambda: secrets.token_hex(32),
         env='CSRF_SECRET'
     )
+    bcrypt_rounds: int = Field(
+        default=12,
+        env='BCRYPT_ROUNDS'
+    )
+    # Argon2id cost for the legacy hash_password; lanes ideally match memory channels
+    argon2_memory_kib: int = Field(
+        default=65536,
+        env='ARGON2_MEMORY_KIB'
+    )
+    argon2_iterations: int = Field(
+        default=3,
+        env='ARGON2_ITERATIONS'
+    )
+    argon2_lanes: int = Field(
+        default=4,
+        env='ARGON2_LANES'
+    )
 
     # Logging
     log_level: str = Field(
@@ -86,22 +118,90 @@ class Settings(BaseModel):
         env='LOG_LEVEL'
     )
 
+    # Derived values, precomputed once for the per-request security checks
+    _admin_group_lower: str = PrivateAttr(default='')
+    _admin_groups: FrozenSet[str] = PrivateAttr(default=frozenset())
+    _csrf_secret_bytes: bytes = PrivateAttr(default=b'')
+
     class Config:
         env_file = '.env'
+        env_file_encoding = 'utf-8'
         case_sensitive = False
 
+    def __init__(self, **data):
+        super().__init__(**data)
+        self._admin_group_lower = self.admin_group.lower()
+        self._admin_groups = frozenset({self._admin_group_lower})
+        self._csrf_secret_bytes = self.csrf_secret.encode()
+
+    @property
+    def admin_group_lower(self) -> str:
+        """Admin group name, lowercased for membership checks."""
+        return self._admin_group_lower
+
+    @property
+    def admin_groups(self) -> FrozenSet[str]:
+        """Lowercased admin group names, for set lookups in the RBAC check."""
+        return self._admin_groups
+
+    @property
+    def csrf_secret_bytes(self) -> bytes:
+        """CSRF secret encoded once for the token serializers."""
+        return self._csrf_secret_bytes
+
     @validator('backup_keep')
     def validate_backup_keep(cls, v):
         if v < 1:
             raise ValueError('BACKUP_KEEP must be at least 1')
         return v
 
+    @validator('audit_buffer_size')
+    def validate_audit_buffer_size(cls, v):
+        if v < 1:
+            raise ValueError('AUDIT_BUFFER_SIZE must be at least 1')
+        return v
+
+    @validator('audit_flush_interval_ms')
+    def validate_audit_flush_interval(cls, v):
+        if v < 1 or v > 60000:
+            raise ValueError('AUDIT_FLUSH_INTERVAL_MS must be between 1 and 60000')
+        return v
+
     @validator('health_timeout_seconds')
     def validate_health_timeout(cls, v):
         if v < 1 or v > 300:
             raise ValueError('HEALTH_TIMEOUT_SECONDS must be between 1 and 300')
         return v
 
+    @validator('bcrypt_rounds')
+    def validate_bcrypt_rounds(cls, v):
+        if v < 4 or v > 31:
+            raise ValueError('BCRYPT_ROUNDS must be between 4 and 31')
+        return v
+
+    @validator('argon2_memory_kib')
+    def validate_argon2_memory(cls, v):
+        if v < 8192 or v > 4194304:
+            raise ValueError('ARGON2_MEMORY_KIB must be between 8192 and 4194304')
+        return v
+
+    @validator('argon2_iterations')
+    def validate_argon2_iterations(cls, v):
+        if v < 1 or v > 16:
+            raise ValueError('ARGON2_ITERATIONS must be between 1 and 16')
+        return v
+
+    @validator('argon2_lanes')
+    def validate_argon2_lanes(cls, v):
+        if v < 1 or v > 64:
+            raise ValueError('ARGON2_LANES must be between 1 and 64')
+        return v
+
+    @validator('csrf_secret')
+    def validate_csrf_secret(cls, v):
+        # An empty CSRF_SECRET falls back to a random per-process secret
+        return v or secrets.token_hex(32)
+
     @validator('session_ttl_minutes')
     def validate_session_ttl(cls, v):
         if v < 1 or v > 1440:
@@ -109,28 +209,15 @@ class Settings(BaseModel):
         return v
 
 
+@functools.lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """
     Get application settings from environment.
 
+    The result is cached, so the environment is read and validated once
+    per process and an auto-generated CSRF secret stays stable.
+
     Returns:
         Settings object with configuration
     """
-    return Settings(
-        port=int(os.getenv('PORT', '8080')),
-        authelia_users_file=os.getenv('AUTHELIA_USERS_FILE', '/data/users.yml'),
-        backup_dir=os.getenv('BACKUP_DIR', '/data/backups'),
-        backup_keep=int(os.getenv('BACKUP_KEEP', '10')),
-        audit_db_path=os.getenv('AUDIT_DB_PATH', '/data/audits.db'),
-        authelia_container=os.getenv('AUTHELIA_CONTAINER', 'authelia'),
-        authelia_config_file=os.getenv('AUTHELIA_CONFIG_FILE', '/config/configuration.yml'),
-        restart_cmd=os.getenv('RESTART_CMD', 'echo "RESTART_CMD not configured - set this to restart Authelia (e.g., docker restart authelia or systemctl restart authelia)"'),
-        health_url=os.getenv('HEALTH_URL', 'http://authelia:9091/api/health'),
-        health_timeout_seconds=int(os.getenv('HEALTH_TIMEOUT_SECONDS', '30')),
-        force_restart=os.getenv('FORCE_RESTART', 'false').lower() == 'true',
-        watch_mode_timeout=int(os.getenv('WATCH_MODE_TIMEOUT', '10')),
-        session_ttl_minutes=int(os.getenv('SESSION_TTL_MINUTES', '30')),
-        admin_group=os.getenv('ADMIN_GROUP', 'authelia-admins'),
-        csrf_secret=os.getenv('CSRF_SECRET', secrets.token_hex(32)),
-        log_level=os.getenv('LOG_LEVEL', 'INFO')
-    )
+    return Settings()
@@ -1,31 +1,158 @@
 """
 SQLite database operations for reading Authelia data
 """
+import asyncio
+import atexit
 import sqlite3
-from typing import Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Applied once when the shared connection is opened
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA trusted_schema=OFF",
+)
+
+# Indexes for the lookups below; Authelia's schema may not provide them
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_totp_username ON totp_configurations(username)",
+    "CREATE INDEX IF NOT EXISTS idx_authlogs_user_time ON authentication_logs(username, time DESC)",
+)
+
+# Static queries kept as constants: sqlite3's statement cache is keyed by SQL text
+_SQL_TOTP_STATUS = """
+    SELECT username, created_at, last_used_at, algorithm, digits, period
+    FROM totp_configurations
+    WHERE username = ?
+"""
+
+_SQL_TOTP_ALL = """
+    SELECT username, created_at, last_used_at, algorithm, digits, period
+    FROM totp_configurations
+"""
+
+_SQL_AUTH_LOGS = """
+    SELECT time, successful, banned, auth_type, remote_ip, request_uri
+    FROM authentication_logs
+    WHERE username = ?
+    ORDER BY time DESC
+    LIMIT ?
+"""
+
+# Stay well under SQLite's bound-parameter limit for IN (...) lists
+_MAX_IN_PARAMS = 500
+
+
+def _batched(items: List[str], size: int = _MAX_IN_PARAMS) -> Iterable[List[str]]:
+    """Split a list into consecutive batches of at most `size` items"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
 
 class AutheliaDatabase:
     """Handler for reading Authelia SQLite database"""
 
     def __init__(self, db_path: str):
         """
-        Initialize database connection
+        Initialize database handler
+
+        The connection is opened lazily on first use and then shared
+        (guarded by a lock) so the page cache survives across requests.
+        Async callers go through run(), which executes every query on one
+        dedicated worker thread.
 
         Args:
             db_path: Path to the Authelia SQLite database
         """
         self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="authelia-db")
+        atexit.register(self._shutdown)
+
+    async def run(self, method: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a database method on the dedicated database thread
+
+        Args:
+            method: Bound AutheliaDatabase method to call
+            *args: Arguments for the method
+
+        Returns:
+            The method's return value
+        """
+        return await asyncio.wrap_future(self._executor.submit(method, *args))
 
     def _get_connection(self) -> sqlite3.Connection:
-        """Get a database connection with row factory"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Get the shared database connection, opening it on first use"""
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=256
+            )
+            conn.row_factory = sqlite3.Row
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._ensure_indexes(conn)
+            self._conn = conn
+            self._optimize()
+        return self._conn
+
+    def _ensure_indexes(self, conn: sqlite3.Connection) -> None:
+        """Create lookup indexes if missing (best effort: the DB belongs to Authelia)"""
+        for statement in _INDEXES:
+            try:
+                conn.execute(statement)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Could not create index ({statement}): {e}")
+
+    def _optimize(self) -> None:
+        """Refresh query planner statistics (caller must hold the lock)"""
+        try:
+            self._conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            logger.warning(f"PRAGMA optimize failed: {e}")
+
+    def optimize(self) -> None:
+        """Run PRAGMA optimize on the shared connection (opening it if needed)"""
+        try:
+            with self._lock:
+                if self._conn is None:
+                    # Opening the connection runs optimize
+                    self._get_connection()
+                else:
+                    self._optimize()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not open database for optimize: {e}")
+
+    def close(self) -> None:
+        """
+        Run PRAGMA optimize and close the shared database connection
+
+        The worker thread is kept: a later query reopens the connection
+        lazily, and the executor is only torn down at interpreter exit.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._optimize()
+                self._conn.close()
+                self._conn = None
+
+    def _shutdown(self) -> None:
+        """Drain the worker thread, then close the connection (atexit hook)"""
+        self._executor.shutdown(wait=True)
+        self.close()
 
     def get_totp_status(self, username: str) -> Optional[Dict]:
         """
@@ -38,18 +165,10 @@ class AutheliaDatabase:
             Dictionary with TOTP info or None if not configured
         """
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT username, created_at, last_used_at, algorithm, digits, period
-                FROM totp_configurations
-                WHERE username = ?
-            """
-
-            cursor.execute(query, (username,))
-            row = cursor.fetchone()
-            conn.close()
+            with self._lock:
+                cursor = self._get_connection().cursor()
+                cursor.execute(_SQL_TOTP_STATUS, (username,))
+                row = cursor.fetchone()
 
             if row:
                 return {
@@ -74,32 +193,107 @@ class AutheliaDatabase:
             Dictionary mapping usernames to their TOTP configs
         """
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            with self._lock:
+                cursor = self._get_connection().cursor()
+                # Plain tuples, read positionally in _SQL_TOTP_ALL column order
+                cursor.row_factory = None
+                cursor.arraysize = 256
+                cursor.execute(_SQL_TOTP_ALL)
+                return {
+                    r[0]: {
+                        'created_at': r[1],
+                        'last_used_at': r[2],
+                        'algorithm': r[3],
+                        'digits': r[4],
+                        'period': r[5]
+                    }
+                    for r in cursor
+                }
 
-            query = """
-                SELECT username, created_at, last_used_at, algorithm, digits, period
-                FROM totp_configurations
-            """
+        except sqlite3.Error as e:
+            logger.error(f"Database error getting all TOTP configs: {e}")
+            return {}
 
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            conn.close()
+    def get_totp_configs_for(self, usernames: List[str]) -> Dict[str, Dict]:
+        """
+        Get the TOTP fields shown on the dashboard for the given users only
 
-            totp_configs = {}
-            for row in rows:
-                totp_configs[row['username']] = {
-                    'created_at': row['created_at'],
-                    'last_used_at': row['last_used_at'],
-                    'algorithm': row['algorithm'],
-                    'digits': row['digits'],
-                    'period': row['period']
-                }
+        Uses an indexed IN (...) lookup instead of scanning the whole table,
+        and projects only the columns the dashboard renders.
+
+        Args:
+            usernames: Usernames to look up
+
+        Returns:
+            Dictionary mapping usernames to their TOTP created/last-used times
+        """
+        totp_configs = {}
+        if not usernames:
+            return totp_configs
+
+        try:
+            with self._lock:
+                cursor = self._get_connection().cursor()
+                cursor.row_factory = None
+                for batch in _batched(usernames):
+                    placeholders = ",".join("?" * len(batch))
+                    cursor.execute(
+                        f"""
+                        SELECT username, created_at, last_used_at
+                        FROM totp_configurations
+                        WHERE username IN ({placeholders})
+                        """,
+                        batch
+                    )
+                    for username, created_at, last_used_at in cursor:
+                        totp_configs[username] = {
+                            'created_at': created_at,
+                            'last_used_at': last_used_at
+                        }
 
             return totp_configs
 
         except sqlite3.Error as e:
-            logger.error(f"Database error getting all TOTP configs: {e}")
+            logger.error(f"Database error getting TOTP configs: {e}")
+            return {}
+
+    def get_last_auth_per_user(self, usernames: List[str]) -> Dict:
+        """
+        Get the most recent authentication time for each of the given users
+
+        One grouped query per batch instead of one lookup per user.
+
+        Args:
+            usernames: Usernames to look up
+
+        Returns:
+            Dictionary mapping usernames to their last authentication time
+        """
+        last_auth = {}
+        if not usernames:
+            return last_auth
+
+        try:
+            with self._lock:
+                cursor = self._get_connection().cursor()
+                cursor.row_factory = None
+                for batch in _batched(usernames):
+                    placeholders = ",".join("?" * len(batch))
+                    cursor.execute(
+                        f"""
+                        SELECT username, MAX(time)
+                        FROM authentication_logs
+                        WHERE username IN ({placeholders})
+                        GROUP BY username
+                        """,
+                        batch
+                    )
+                    last_auth.update(cursor.fetchall())
+
+            return last_auth
+
+        except sqlite3.Error as e:
+            logger.error(f"Database error getting last authentication times: {e}")
             return {}
 
     def get_authentication_logs(self, username: str, limit: int = 10) -> list:
@@ -114,20 +308,10 @@ class AutheliaDatabase:
             List of authentication log entries
         """
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-
-            query = """
-                SELECT time, successful, banned, auth_type, remote_ip, request_uri
-                FROM authentication_logs
-                WHERE username = ?
-                ORDER BY time DESC
-                LIMIT ?
-            """
-
-            cursor.execute(query, (username, limit))
-            rows = cursor.fetchall()
-            conn.close()
+            with self._lock:
+                cursor = self._get_connection().cursor()
+                cursor.execute(_SQL_AUTH_LOGS, (username, limit))
+                rows = cursor.fetchall()
 
             logs = []
             for row in rows:
@@ -1,13 +1,16 @@
 """
 Authelia User Management GUI - FastAPI Application
 """
-from fastapi import FastAPI, Request, Form
+from fastapi import BackgroundTasks, FastAPI, Request, Form
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
-from typing import List, Optional
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
+from jinja2 import FileSystemBytecodeCache
+from typing import List, Optional, Tuple
+import asyncio
 import logging
 import os
+import time
 
 from models import UserDetail
 from database import AutheliaDatabase
@@ -25,7 +28,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Authelia User Management",
     description="Simple GUI for managing Authelia users",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # Paths configuration - will be mounted from Docker
@@ -38,30 +42,63 @@ DB_PATH = os.path.join(AUTHELIA_PATH, 'config', 'db.sqlite3')
 yaml_handler = AutheliaYAMLHandler(USERS_YAML_PATH)
 db_handler = AutheliaDatabase(DB_PATH)
 
+# Dashboard user list cache: reused while both files are unchanged and the TTL holds
+USERS_CACHE_TTL_SECONDS = 2.0
+_users_cache = {"key": None, "value": None, "ts": 0.0}
+
+# Consecutive user edits within this window share a single Authelia restart,
+# which runs at the end of the window (after the last of those edits)
+RESTART_DEBOUNCE_SECONDS = 3.0
+RESTART_TIMEOUT_SECONDS = 10
+_restart_pending = False
+
 # Setup templates and static files
+# (templates only change on redeploy: skip mtime checks, keep compiled bytecode)
 templates = Jinja2Templates(directory="../templates")
+templates.env.auto_reload = False
+templates.env.bytecode_cache = FileSystemBytecodeCache()
 app.mount("/static", StaticFiles(directory="../static"), name="static")
 
 
-def get_users_with_details() -> List[UserDetail]:
+@app.on_event("startup")
+async def optimize_database():
+    """Open the database and refresh planner statistics once at startup"""
+    await db_handler.run(db_handler.optimize)
+
+
+@app.on_event("shutdown")
+async def close_database():
+    """Refresh planner statistics and close the database on shutdown"""
+    db_handler.close()
+
+
+async def get_users_with_details() -> Tuple[List[UserDetail], int]:
     """
     Get all users with their 2FA status from both YAML and database
 
     Returns:
-        List of UserDetail objects
+        Tuple of (list of UserDetail objects, number of users with 2FA)
     """
     users_list = []
+    totp_count = 0
 
     # Get users from YAML
     yaml_users = yaml_handler.get_all_users_list()
 
-    # Get TOTP configs from database
-    totp_configs = db_handler.get_all_totp_configs()
+    usernames = [u['username'] for u in yaml_users]
+
+    # Get TOTP configs from database (only for users present in YAML)
+    totp_configs = await db_handler.run(db_handler.get_totp_configs_for, usernames)
+
+    # Get last authentication time per user in one grouped query
+    last_auth = await db_handler.run(db_handler.get_last_auth_per_user, usernames)
 
     # Combine the data
     for user in yaml_users:
         username = user['username']
         totp_config = totp_configs.get(username)
+        if totp_config is not None:
+            totp_count += 1
 
         user_detail = UserDetail(
             username=username,
@@ -70,12 +107,90 @@ def get_users_with_details() -> List[UserDetail]:
             groups=user.get('groups', []),
             has_totp=totp_config is not None,
             totp_last_used=totp_config.get('last_used_at') if totp_config else None,
-            totp_created_at=totp_config.get('created_at') if totp_config else None
+            totp_created_at=totp_config.get('created_at') if totp_config else None,
+            last_auth=last_auth.get(username)
         )
 
         users_list.append(user_detail)
 
-    return users_list
+    return users_list, totp_count
+
+
+async def get_cached_users_with_details() -> Tuple[List[UserDetail], int]:
+    """
+    Cached wrapper around get_users_with_details()
+
+    Returns:
+        Tuple of (list of UserDetail objects, number of users with 2FA)
+    """
+    try:
+        key = (os.stat(USERS_YAML_PATH).st_mtime_ns, os.stat(DB_PATH).st_mtime_ns)
+    except OSError:
+        key = None
+
+    now = time.monotonic()
+    if (key is not None and key == _users_cache["key"]
+            and now - _users_cache["ts"] < USERS_CACHE_TTL_SECONDS):
+        return _users_cache["value"]
+
+    result = await get_users_with_details()
+    _users_cache.update(key=key, value=result, ts=now)
+    return result
+
+
+def invalidate_users_cache() -> None:
+    """Force the next dashboard load to re-read users"""
+    _users_cache["key"] = None
+
+
+async def _restart_authelia() -> None:
+    """Restart the Authelia container so it reloads users.yml"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            'docker', 'restart', 'authelia',
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            await asyncio.wait_for(process.wait(), timeout=RESTART_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            process.kill()
+            logger.warning("Authelia restart timed out")
+            return
+        logger.info("Authelia restarted to load user changes")
+    except Exception as e:
+        logger.warning(f"Could not restart Authelia: {e}")
+
+
+async def _debounced_restart_authelia() -> None:
+    """Wait out the debounce window, then restart Authelia once"""
+    global _restart_pending
+    try:
+        await asyncio.sleep(RESTART_DEBOUNCE_SECONDS)
+    finally:
+        # Cleared before restarting: an edit made while the restart runs
+        # may be missed by it, so it must be able to schedule the next one
+        _restart_pending = False
+    await _restart_authelia()
+
+
+def schedule_authelia_restart(background: BackgroundTasks) -> None:
+    """
+    Restart Authelia after the response is sent
+
+    Trailing debounce: the restart runs RESTART_DEBOUNCE_SECONDS after it
+    is scheduled, and edits made before then join that pending restart
+    instead of scheduling their own.
+
+    Args:
+        background: Background tasks of the current request
+    """
+    global _restart_pending
+    if _restart_pending:
+        logger.info("Authelia restart already pending, joining it")
+        return
+    _restart_pending = True
+    background.add_task(_debounced_restart_authelia)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -90,7 +205,7 @@ async def dashboard(request: Request):
         Rendered HTML template
     """
     try:
-        users = get_users_with_details()
+        users, users_with_2fa = await get_cached_users_with_details()
         logger.info(f"Dashboard loaded with {len(users)} users")
 
         return templates.TemplateResponse(
@@ -99,7 +214,7 @@ async def dashboard(request: Request):
                 "request": request,
                 "users": users,
                 "total_users": len(users),
-                "users_with_2fa": sum(1 for u in users if u.has_totp)
+                "users_with_2fa": users_with_2fa
             }
         )
     except Exception as e:
@@ -139,10 +254,10 @@ async def user_detail(request: Request, username: str):
             )
 
         # Get TOTP status from database
-        totp_config = db_handler.get_totp_status(username)
+        totp_config = await db_handler.run(db_handler.get_totp_status, username)
 
         # Get recent auth logs
-        auth_logs = db_handler.get_authentication_logs(username, limit=10)
+        auth_logs = await db_handler.run(db_handler.get_authentication_logs, username, 10)
 
         user_detail = UserDetail(
             username=username,
@@ -198,6 +313,7 @@ async def create_user_form(request: Request):
 @app.post("/create-user", response_class=HTMLResponse)
 async def create_user(
     request: Request,
+    background: BackgroundTasks,
     username: str = Form(...),
     email: str = Form(...),
     displayname: str = Form(...),
@@ -211,6 +327,7 @@ async def create_user(
 
     Args:
         request: FastAPI request object
+        background: Background tasks used to restart Authelia
         username: Username for the new user
         email: Email address
         displayname: Display name
@@ -278,17 +395,12 @@ async def create_user(
         else:
             plain_password = generate_secure_password()
 
-        # Hash the password
-        password_hash = hash_password(plain_password)
+        # Hash the password off the event loop: Argon2id is deliberately slow
+        password_hash = await asyncio.to_thread(hash_password, plain_password)
 
-        # Process groups
-        all_groups = list(groups)
-        if custom_groups:
-            custom_list = [g.strip() for g in custom_groups.split(',') if g.strip()]
-            all_groups.extend(custom_list)
-
-        # Remove duplicates
-        all_groups = list(set(all_groups))
+        # Process groups: selected + custom, deduplicated in insertion order
+        custom_list = [g.strip() for g in (custom_groups or '').split(',') if g.strip()]
+        all_groups = list(dict.fromkeys([*groups, *custom_list]))
 
         # Create the user
         success = yaml_handler.add_user(
@@ -298,22 +410,14 @@ async def create_user(
             password_hash=password_hash,
             groups=all_groups
         )
+        invalidate_users_cache()
 
         if success:
             logger.info(f"User '{username}' created successfully")
 
             # Restart Authelia to immediately load the new user
             # This is more reliable than file watching with bind mounts
-            try:
-                import subprocess
-                subprocess.run(
-                    ['docker', 'restart', 'authelia'],
-                    capture_output=True,
-                    timeout=10
-                )
-                logger.info("Authelia restarted to load new user")
-            except Exception as e:
-                logger.warning(f"Could not restart Authelia: {e}")
+            schedule_authelia_restart(background)
 
             return templates.TemplateResponse(
                 "create_user.html",
@@ -350,12 +454,13 @@ async def create_user(
 
 
 @app.post("/delete-user/{username}")
-async def delete_user(request: Request, username: str):
+async def delete_user(request: Request, username: str, background: BackgroundTasks):
     """
     Delete a user from users.yml
 
     Args:
         request: FastAPI request object
+        background: Background tasks used to restart Authelia
         username: Username to delete
 
     Returns:
@@ -373,8 +478,9 @@ async def delete_user(request: Request, username: str):
         user_groups = user_config.get('groups', [])
         if 'admins' in user_groups:
             # Count total admins
-            all_users = yaml_handler.get_all_users_list()
-            admin_count = sum(1 for u in all_users if 'admins' in u.get('groups', []))
+            admin_count = sum(
+                1 for groups in yaml_handler.get_columns()['groups'] if 'admins' in groups
+            )
 
             if admin_count <= 1:
                 logger.warning(f"Attempt to delete last admin user: {username}")
@@ -382,21 +488,13 @@ async def delete_user(request: Request, username: str):
 
         # Delete the user
         success = yaml_handler.delete_user(username)
+        invalidate_users_cache()
 
         if success:
             logger.info(f"User '{username}' deleted successfully")
 
             # Restart Authelia asynchronously (don't block the response)
-            try:
-                import subprocess
-                subprocess.Popen(
-                    ['docker', 'restart', 'authelia'],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL
-                )
-                logger.info("Authelia restart initiated")
-            except Exception as e:
-                logger.warning(f"Could not restart Authelia: {e}")
+            schedule_authelia_restart(background)
 
             return RedirectResponse(url="/?success=user_deleted", status_code=303)
         else:
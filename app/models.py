@@ -11,12 +11,89 @@ This is supported and maintained by Pydantic team. Future versions may migrate
 to v2-native patterns (field_validator, model_config) if needed.
 """
 import re
-from typing import List, Dict
-from pydantic import BaseModel, Field, validator, EmailStr
+import string
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, validator
 
 
-# Username validation regex: lowercase letters/numbers, can contain . _ - but not at start/end
-USERNAME_PATTERN = re.compile(r'^[a-z0-9][a-z0-9._-]{1,30}[a-z0-9]$')
+# Username rules: 2-32 lowercase letters/numbers, can contain . _ - but not at start/end
+USERNAME_MIN_LENGTH = 2
+USERNAME_MAX_LENGTH = 32
+USERNAME_EDGE_CHARS = frozenset(string.ascii_lowercase + string.digits)
+USERNAME_CHARS = USERNAME_EDGE_CHARS | frozenset('._-')
+
+# Email: one "@", non-empty local part, a dot in the domain, no whitespace
+# (unanchored: always use EMAIL_PATTERN.fullmatch, via is_valid_email)
+EMAIL_PATTERN = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+# RFC 5321 limit on a forward path; also bounds the regex backtracking
+EMAIL_MAX_LENGTH = 254
+
+# Bcrypt hash identifiers ($2a$, $2b$, $2y$) and the shortest accepted hash
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+MIN_PASSWORD_HASH_LENGTH = 20
+
+
+def is_valid_username(username: str) -> bool:
+    """
+    Check a (normalized) username against the username rules.
+
+    Plain length, index and set checks: cheaper than a regex match for
+    strings this short.
+
+    Args:
+        username: Username to check
+
+    Returns:
+        True if the username is valid
+    """
+    return (
+        USERNAME_MIN_LENGTH <= len(username) <= USERNAME_MAX_LENGTH
+        and username[0] in USERNAME_EDGE_CHARS
+        and username[-1] in USERNAME_EDGE_CHARS
+        and USERNAME_CHARS.issuperset(username)
+    )
+
+
+def is_valid_email(email: str) -> bool:
+    """
+    Check a (normalized) email address against EMAIL_PATTERN.
+
+    Over-long input and anything without exactly one "@" is rejected
+    before the regex runs, so the pattern never backtracks over
+    attacker-sized strings.
+
+    Args:
+        email: Email address to check
+
+    Returns:
+        True if the email is valid
+    """
+    return (
+        len(email) <= EMAIL_MAX_LENGTH
+        and email.count('@') == 1
+        and EMAIL_PATTERN.fullmatch(email) is not None
+    )
+
+
+def _normalize_group(group: Optional[str]) -> Optional[str]:
+    """Strip and lowercase a group name; falsy for empty or blank names."""
+    return group.strip().lower() if group else None
+
+
+def normalize_groups(groups: List[str]) -> List[str]:
+    """
+    Normalize groups: lowercase, strip, drop empty, deduplicate.
+
+    Single pass: dict.fromkeys deduplicates while keeping first-seen order.
+
+    Args:
+        groups: Raw group names
+
+    Returns:
+        Normalized group names
+    """
+    return list(dict.fromkeys(filter(None, map(_normalize_group, groups))))
 
 
 class UserConfig(BaseModel):
@@ -30,10 +107,9 @@ class UserConfig(BaseModel):
     @validator('password')
     def validate_password_hash(cls, v):
         """Ensure password is a valid bcrypt hash."""
-        if not v or len(v) < 20:
+        if not v or len(v) < MIN_PASSWORD_HASH_LENGTH:
             raise ValueError("Invalid password hash")
-        # Bcrypt hashes start with $2a$, $2b$, or $2y$
-        if not v.startswith(('$2a$', '$2b$', '$2y$')):
+        if not v.startswith(BCRYPT_PREFIXES):
             raise ValueError("Password must be a bcrypt hash (starts with $2a$, $2b$, or $2y$)")
         return v
 
@@ -43,7 +119,7 @@ class UserConfig(BaseModel):
         v = v.strip().lower()
         if not v:
             raise ValueError("Email cannot be empty")
-        if '@' not in v or '.' not in v.split('@')[-1]:
+        if not is_valid_email(v):
             raise ValueError("Invalid email format")
         return v
 
@@ -52,16 +128,7 @@ class UserConfig(BaseModel):
         """Normalize groups: lowercase, deduplicate, remove empty."""
         if not isinstance(v, list):
             raise ValueError("Groups must be a list")
-        # Normalize: lowercase, strip whitespace, remove empty strings
-        normalized = [g.strip().lower() for g in v if g and g.strip()]
-        # Deduplicate while preserving order
-        seen = set()
-        deduped = []
-        for group in normalized:
-            if group not in seen:
-                seen.add(group)
-                deduped.append(group)
-        return deduped
+        return normalize_groups(v)
 
     class Config:
         extra = 'forbid'  # Reject unknown fields
@@ -78,12 +145,13 @@ class UsersFile(BaseModel):
         if not isinstance(v, dict):
             raise ValueError("Users must be a dictionary")
 
-        for username in v.keys():
-            if not USERNAME_PATTERN.match(username):
-                raise ValueError(
-                    f"Invalid username '{username}': must be lowercase alphanumeric, "
-                    f"2-32 characters, can contain . _ - but not at start/end"
-                )
+        invalid = [username for username in v if not is_valid_username(username)]
+        if invalid:
+            names = ", ".join(f"'{username}'" for username in invalid)
+            raise ValueError(
+                f"Invalid username {names}: must be lowercase alphanumeric, "
+                f"2-32 characters, can contain . _ - but not at start/end"
+            )
 
         return v
 
@@ -104,7 +172,7 @@ class CreateUserRequest(BaseModel):
     def validate_username(cls, v):
         """Validate username format."""
         v = v.strip().lower()
-        if not USERNAME_PATTERN.match(v):
+        if not is_valid_username(v):
             raise ValueError(
                 "Username must be lowercase alphanumeric, 2-32 characters, "
                 "can contain . _ - but not at start/end"
@@ -115,7 +183,7 @@ class CreateUserRequest(BaseModel):
     def validate_email(cls, v):
         """Validate and normalize email."""
         v = v.strip().lower()
-        if '@' not in v or '.' not in v.split('@')[-1]:
+        if not is_valid_email(v):
             raise ValueError("Invalid email format")
         return v
 
@@ -133,16 +201,20 @@ class CreateUserRequest(BaseModel):
     @validator('groups')
     def validate_groups(cls, v):
         """Normalize groups."""
-        normalized = [g.strip().lower() for g in v if g and g.strip()]
-        # Deduplicate
-        return list(dict.fromkeys(normalized))
+        return normalize_groups(v)
 
     class Config:
         extra = 'forbid'
 
 
-class UserListItem(BaseModel):
-    """User information for list display."""
+@dataclass(frozen=True, slots=True)
+class UserListItem:
+    """
+    User information for list display.
+
+    Plain dataclass rather than a Pydantic model: it is built from
+    already-validated UserConfig data on every dashboard render.
+    """
 
     username: str
     email: str
@@ -150,5 +222,21 @@ class UserListItem(BaseModel):
     groups: List[str]
     has_totp: bool = False
 
-    class Config:
-        extra = 'allow'
+
+@dataclass(frozen=True, slots=True)
+class UserDetail:
+    """
+    User information combined with TOTP and authentication data.
+
+    Plain dataclass for the same reason as UserListItem: it is built from
+    trusted users.yml and Authelia database data on every render.
+    """
+
+    username: str
+    email: str
+    displayname: str
+    groups: List[str]
+    has_totp: bool = False
+    totp_last_used: Optional[Any] = None
+    totp_created_at: Optional[Any] = None
+    last_auth: Optional[Any] = None
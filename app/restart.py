@@ -18,6 +18,49 @@ from authelia_config import detect_watch_mode
 
 logger = logging.getLogger(__name__)
 
+# Health poll backoff: start fast for quick restarts, back off to the cap
+POLL_INTERVAL_INITIAL = 0.05
+POLL_INTERVAL_MAX = 1.0
+POLL_BACKOFF_FACTOR = 1.7
+
+# Watch mode: Authelia stays healthy while it reloads, so a health poll
+# alone proves nothing. Give the file watcher this long before polling.
+WATCH_MODE_RELOAD_GRACE_SECONDS = 2.0
+
+# Only the tail of the restart command's output is kept (for error messages)
+RESTART_OUTPUT_TAIL_BYTES = 4096
+
+# Shared health-check client: keep-alive connections are reused across polls
+_health_client: Optional[httpx.AsyncClient] = None
+
+
+def get_health_client() -> httpx.AsyncClient:
+    """
+    Get the shared health-check HTTP client, creating it on first use.
+
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    global _health_client
+    if _health_client is None or _health_client.is_closed:
+        _health_client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(
+                max_keepalive_connections=4,
+                max_connections=8,
+                keepalive_expiry=30.0
+            )
+        )
+    return _health_client
+
+
+async def close_health_client() -> None:
+    """Close the shared health-check HTTP client (call on shutdown)."""
+    global _health_client
+    if _health_client is not None:
+        await _health_client.aclose()
+        _health_client = None
+
 
 class RestartError(Exception):
     """Raised when restart operation fails."""
@@ -53,45 +96,46 @@ async def wait_for_watch_mode_reload(
     """
     timeout = settings.watch_mode_timeout
     start_time = asyncio.get_event_loop().time()
-    poll_interval = 1.0
+    interval = POLL_INTERVAL_INITIAL
 
     logger.info(f"Watch mode enabled: waiting for file reload (timeout: {timeout}s)")
 
-    # Simple approach: wait for a short period and check health
-    # In watch mode, Authelia should detect the change within seconds
-    await asyncio.sleep(2)  # Give Authelia time to detect file change
+    # Give Authelia time to detect the file change; backoff only applies
+    # to the polls after this
+    await asyncio.sleep(WATCH_MODE_RELOAD_GRACE_SECONDS)
 
     try:
         # Poll health to ensure Authelia is still responsive
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            while True:
-                elapsed = asyncio.get_event_loop().time() - start_time
+        client = get_health_client()
+        while True:
+            elapsed = asyncio.get_event_loop().time() - start_time
 
-                if elapsed > timeout:
-                    raise WatchModeTimeout(
-                        f"Watch mode reload timeout after {timeout} seconds. "
-                        "File changes may not have been detected."
-                    )
+            if elapsed > timeout:
+                raise WatchModeTimeout(
+                    f"Watch mode reload timeout after {timeout} seconds. "
+                    "File changes may not have been detected."
+                )
 
-                try:
-                    response = await client.get(settings.health_url)
-
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                            if data.get('status') in ['UP', 'OK', 'healthy']:
-                                logger.info(f"Authelia responded healthy during watch mode (elapsed: {elapsed:.1f}s)")
-                                return True, f"File changes detected by watch mode (auto-reload in {elapsed:.1f}s)"
-                        except:
-                            # If can't parse JSON but got 200, consider it healthy
+            try:
+                response = await client.get(settings.health_url)
+
+                if response.status_code == 200:
+                    try:
+                        data = response.json()
+                        if data.get('status') in ['UP', 'OK', 'healthy']:
                             logger.info(f"Authelia responded healthy during watch mode (elapsed: {elapsed:.1f}s)")
                             return True, f"File changes detected by watch mode (auto-reload in {elapsed:.1f}s)"
+                    except:
+                        # If can't parse JSON but got 200, consider it healthy
+                        logger.info(f"Authelia responded healthy during watch mode (elapsed: {elapsed:.1f}s)")
+                        return True, f"File changes detected by watch mode (auto-reload in {elapsed:.1f}s)"
 
-                except httpx.RequestError as e:
-                    logger.debug(f"Health check during watch mode failed: {e}, retrying...")
+            except httpx.RequestError as e:
+                logger.debug(f"Health check during watch mode failed: {e}, retrying...")
 
-                # Wait before next poll
-                await asyncio.sleep(poll_interval)
+            # Wait before next poll, backing off up to the cap
+            await asyncio.sleep(interval)
+            interval = min(interval * POLL_BACKOFF_FACTOR, POLL_INTERVAL_MAX)
 
     except WatchModeTimeout as e:
         logger.warning(str(e))
@@ -122,6 +166,7 @@ async def apply_changes(settings: Settings, username: Optional[str] = None) -> T
 
     # Detect watch mode
     try:
+        # Memoized per config file stat: a stat() per call, no re-parse
         watch_mode_enabled = detect_watch_mode(settings.authelia_config_file)
 
         if watch_mode_enabled:
@@ -158,13 +203,14 @@ async def restart_authelia(settings: Settings) -> Tuple[bool, str]:
         result = await asyncio.create_subprocess_shell(
             settings.restart_cmd,
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+            stderr=asyncio.subprocess.STDOUT
         )
 
-        stdout, stderr = await result.communicate()
+        output_tail = await _read_tail(result.stdout, RESTART_OUTPUT_TAIL_BYTES)
+        await result.wait()
 
         if result.returncode != 0:
-            error_msg = stderr.decode().strip() or stdout.decode().strip()
+            error_msg = output_tail.decode(errors='replace').strip()
             logger.error(f"Restart command failed: {error_msg}")
             raise RestartError(f"Restart command failed: {error_msg}")
 
@@ -186,6 +232,27 @@ async def restart_authelia(settings: Settings) -> Tuple[bool, str]:
         return False, f"Restart failed: {str(e)}"
 
 
+async def _read_tail(stream: asyncio.StreamReader, limit: int) -> bytes:
+    """
+    Drain a stream, keeping only its last `limit` bytes.
+
+    Args:
+        stream: Subprocess output stream
+        limit: Maximum number of trailing bytes to keep
+
+    Returns:
+        The last `limit` bytes of the stream
+    """
+    tail = bytearray()
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return bytes(tail)
+        tail += chunk
+        if len(tail) > limit:
+            del tail[:-limit]
+
+
 async def poll_health(settings: Settings) -> None:
     """
     Poll Authelia health endpoint until healthy or timeout.
@@ -198,45 +265,46 @@ async def poll_health(settings: Settings) -> None:
     """
     timeout = settings.health_timeout_seconds
     start_time = asyncio.get_event_loop().time()
-    poll_interval = 1.0  # Poll every second
+    interval = POLL_INTERVAL_INITIAL
 
     logger.info(f"Polling health endpoint: {settings.health_url} (timeout: {timeout}s)")
 
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        while True:
-            elapsed = asyncio.get_event_loop().time() - start_time
+    client = get_health_client()
+    while True:
+        elapsed = asyncio.get_event_loop().time() - start_time
 
-            if elapsed > timeout:
-                raise HealthCheckTimeout(
-                    f"Health check timed out after {timeout} seconds. "
-                    "Authelia may still be starting. Check logs and try again."
-                )
+        if elapsed > timeout:
+            raise HealthCheckTimeout(
+                f"Health check timed out after {timeout} seconds. "
+                "Authelia may still be starting. Check logs and try again."
+            )
 
-            try:
-                response = await client.get(settings.health_url)
+        try:
+            response = await client.get(settings.health_url)
 
-                if response.status_code == 200:
-                    # Check response body for status
-                    try:
-                        data = response.json()
-                        if data.get('status') in ['UP', 'OK', 'healthy']:
-                            logger.info(f"Authelia is healthy (elapsed: {elapsed:.1f}s)")
-                            return
-                    except:
-                        # If can't parse JSON but got 200, consider it healthy
+            if response.status_code == 200:
+                # Check response body for status
+                try:
+                    data = response.json()
+                    if data.get('status') in ['UP', 'OK', 'healthy']:
                         logger.info(f"Authelia is healthy (elapsed: {elapsed:.1f}s)")
                         return
+                except:
+                    # If can't parse JSON but got 200, consider it healthy
+                    logger.info(f"Authelia is healthy (elapsed: {elapsed:.1f}s)")
+                    return
 
-                logger.debug(
-                    f"Health check returned {response.status_code}, "
-                    f"retrying... (elapsed: {elapsed:.1f}s)"
-                )
+            logger.debug(
+                f"Health check returned {response.status_code}, "
+                f"retrying... (elapsed: {elapsed:.1f}s)"
+            )
 
-            except httpx.RequestError as e:
-                logger.debug(f"Health check connection failed: {e}, retrying...")
+        except httpx.RequestError as e:
+            logger.debug(f"Health check connection failed: {e}, retrying...")
 
-            # Wait before next poll
-            await asyncio.sleep(poll_interval)
+        # Wait before next poll, backing off up to the cap
+        await asyncio.sleep(interval)
+        interval = min(interval * POLL_BACKOFF_FACTOR, POLL_INTERVAL_MAX)
 
 
 def restart_authelia_sync(settings: Settings) -> Tuple[bool, str]:
@@ -249,4 +317,11 @@ def restart_authelia_sync(settings: Settings) -> Tuple[bool, str]:
     Returns:
         Tuple of (success: bool, message: str)
     """
-    return asyncio.run(restart_authelia(settings))
+    async def _run() -> Tuple[bool, str]:
+        try:
+            return await restart_authelia(settings)
+        finally:
+            # The shared client is bound to this throwaway event loop
+            await close_health_client()
+
+    return asyncio.run(_run())
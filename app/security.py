@@ -8,21 +8,85 @@ Implements:
 - Security headers
 - Actor extraction
 """
+import functools
 import json
+import re
 import secrets
-from datetime import datetime, timedelta
-from typing import Optional, Callable
+import time
+from collections import OrderedDict
+from typing import FrozenSet, Optional, Callable, Tuple
 from itsdangerous import URLSafeTimedSerializer, BadSignature
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
-from starlette.datastructures import MutableHeaders
 import logging
 
 from config import Settings
 
 logger = logging.getLogger(__name__)
 
+# Methods that require RBAC + CSRF, and paths exempt from both
+_STATE_CHANGING_METHODS = frozenset({'POST', 'DELETE', 'PUT', 'PATCH'})
+_EXEMPT_PATHS = frozenset({'/watch-mode-status'})
+
+# Form endpoints that may carry the CSRF token as a csrf_token field; every
+# other request must send the X-CSRF-Token header (no body parsing)
+_FORM_CSRF_PATHS = frozenset({'/users'})
+_FORM_CONTENT_TYPES = ('multipart/form-data', 'application/x-www-form-urlencoded')
+
+# One group name in X-Forwarded-Groups (comma- or space-separated)
+_GROUP_TOKEN = re.compile(r'[^\s,]+')
+
+# CSRF token lifetime, and how many verified tokens to remember
+CSRF_MAX_AGE_SECONDS = 3600
+_CSRF_VERIFY_CACHE_SIZE = 128
+
+# Cookies are re-issued only once this old (CSRF: seconds; session: fraction of TTL)
+CSRF_REFRESH_AFTER_SECONDS = 1800
+SESSION_REFRESH_FRACTION = 0.2
+
+# Added to every response
+_SECURITY_HEADERS = {
+    'Content-Security-Policy': "default-src 'self'; style-src 'self' 'unsafe-inline'; script-src 'self' 'unsafe-inline'; frame-ancestors 'none';",
+    'X-Frame-Options': 'DENY',
+    'Referrer-Policy': 'no-referrer',
+    'Strict-Transport-Security': 'max-age=31536000',
+    'X-Content-Type-Options': 'nosniff',
+    'X-XSS-Protection': '1; mode=block',
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_groups(forwarded_groups: str) -> FrozenSet[str]:
+    """
+    Parse an X-Forwarded-Groups value into lowercased group names.
+
+    Cached per header value: the same user sends the same groups on
+    every request.
+
+    Args:
+        forwarded_groups: Raw header value (comma- or space-separated)
+
+    Returns:
+        Frozen set of lowercased group names
+    """
+    return frozenset(match.group().lower() for match in _GROUP_TOKEN.finditer(forwarded_groups))
+
+
+@functools.lru_cache(maxsize=8)
+def get_serializer(secret: bytes, salt: str) -> URLSafeTimedSerializer:
+    """
+    Get a shared serializer for the given secret and salt.
+
+    Args:
+        secret: Signing secret
+        salt: Namespace salt ('csrf' or 'session')
+
+    Returns:
+        Cached URLSafeTimedSerializer
+    """
+    return URLSafeTimedSerializer(secret, salt=salt)
+
 
 class SecurityMiddleware(BaseHTTPMiddleware):
     """
@@ -32,12 +96,20 @@ class SecurityMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, settings: Settings):
         super().__init__(app)
         self.settings = settings
-        self.csrf_serializer = URLSafeTimedSerializer(settings.csrf_secret, salt='csrf')
-        self.session_serializer = URLSafeTimedSerializer(settings.csrf_secret, salt='session')
+        self.csrf_serializer = get_serializer(settings.csrf_secret_bytes, 'csrf')
+        self.session_serializer = get_serializer(settings.csrf_secret_bytes, 'session')
+        # Verified CSRF token -> (expiry as unix time, payload)
+        self._csrf_verify_cache: OrderedDict = OrderedDict()
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """Process request through security checks."""
 
+        # Health probes skip actor/session/RBAC/CSRF work entirely
+        if request.url.path == '/health':
+            response = await call_next(request)
+            self._add_security_headers(response)
+            return response
+
         # Extract actor from forwarded headers
         actor = extract_actor(request)
         request.state.actor = actor
@@ -46,40 +118,39 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         ip_address = extract_ip(request)
         request.state.ip = ip_address
 
-        # Check session TTL for all requests except health check
-        if request.url.path != '/health':
-            session_valid = self._check_session(request)
-            if not session_valid and request.url.path != '/':
+        # Guarantee the attributes exist so endpoints can read them directly
+        request.state.csrf_token = ''
+        request.state.session_age_seconds = None
+
+        # Check session TTL
+        session_valid = self._check_session(request)
+        if not session_valid and request.url.path != '/':
+            return JSONResponse(
+                {'error': 'Session expired', 'detail': 'Please refresh the page'},
+                status_code=401
+            )
+
+        # RBAC + CSRF for state-changing requests (POST, PUT, PATCH, DELETE)
+        if request.method in _STATE_CHANGING_METHODS and request.url.path not in _EXEMPT_PATHS:
+            if not self._check_rbac(request):
+                logger.warning(
+                    f"RBAC denied for {actor} from {ip_address} on {request.url.path}",
+                    extra={'actor': actor, 'ip': ip_address, 'path': request.url.path}
+                )
                 return JSONResponse(
-                    {'error': 'Session expired', 'detail': 'Please refresh the page'},
-                    status_code=401
+                    {'error': 'Forbidden', 'detail': f'Admin group "{self.settings.admin_group}" required'},
+                    status_code=403
                 )
 
-        # RBAC check for modifying endpoints (exempt /health and /watch-mode-status)
-        if request.method in ['POST', 'DELETE', 'PUT', 'PATCH']:
-            if request.url.path not in ['/health', '/watch-mode-status']:
-                if not self._check_rbac(request):
-                    logger.warning(
-                        f"RBAC denied for {actor} from {ip_address} on {request.url.path}",
-                        extra={'actor': actor, 'ip': ip_address, 'path': request.url.path}
-                    )
-                    return JSONResponse(
-                        {'error': 'Forbidden', 'detail': f'Admin group "{self.settings.admin_group}" required'},
-                        status_code=403
-                    )
-
-        # CSRF check for all state-changing requests: POST, PUT, PATCH, DELETE
-        if request.method in ['POST', 'DELETE', 'PUT', 'PATCH']:
-            if request.url.path not in ['/health', '/watch-mode-status']:
-                if not await self._check_csrf(request):
-                    logger.warning(
-                        f"CSRF check failed for {actor} from {ip_address}",
-                        extra={'actor': actor, 'ip': ip_address}
-                    )
-                    return JSONResponse(
-                        {'error': 'CSRF validation failed', 'detail': 'Invalid or missing CSRF token'},
-                        status_code=400
-                    )
+            if not await self._check_csrf(request):
+                logger.warning(
+                    f"CSRF check failed for {actor} from {ip_address}",
+                    extra={'actor': actor, 'ip': ip_address}
+                )
+                return JSONResponse(
+                    {'error': 'CSRF validation failed', 'detail': 'Invalid or missing CSRF token'},
+                    status_code=400
+                )
 
         # Process request
         response = await call_next(request)
@@ -88,11 +159,10 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         self._add_security_headers(response)
 
         # Update session cookie
-        if request.url.path != '/health':
-            self._update_session(response)
+        self._update_session(response, request)
 
         # Add/refresh CSRF token (on GET requests for HTML pages)
-        if request.url.path != '/health' and request.method == 'GET':
+        if request.method == 'GET':
             self._set_csrf_cookie(response, request)
 
         return response
@@ -112,10 +182,9 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         if not forwarded_groups:
             return False
 
-        # Groups can be comma-separated or space-separated
-        groups = [g.strip() for g in forwarded_groups.replace(',', ' ').split() if g.strip()]
-
-        return self.settings.admin_group in groups
+        # Compare case-insensitively (group names in users.yml are normalized
+        # to lowercase); repeated header values are parsed only once
+        return not self.settings.admin_groups.isdisjoint(_parse_groups(forwarded_groups))
 
     async def _check_csrf(self, request: Request) -> bool:
         """
@@ -123,7 +192,8 @@ class SecurityMiddleware(BaseHTTPMiddleware):
 
         Implements double-submit cookie pattern:
         - Token stored in 'csrf' cookie
-        - Client sends it back via X-CSRF-Token header OR csrf_token form field
+        - Client sends it back via X-CSRF-Token header, or as a csrf_token
+          form field on the form endpoints in _FORM_CSRF_PATHS
 
         Args:
             request: Starlette request object
@@ -139,34 +209,69 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         # Get submitted token from either header or form
         submitted_token = request.headers.get('X-CSRF-Token', '')
 
-        # If not in header, try form data
-        if not submitted_token:
-            try:
-                # Check if content-type is form data
-                content_type = request.headers.get('content-type', '')
-                if 'multipart/form-data' in content_type or 'application/x-www-form-urlencoded' in content_type:
+        # If not in header, try form data (form endpoints only; avoids buffering other bodies)
+        if not submitted_token and request.url.path in _FORM_CSRF_PATHS:
+            content_type = request.headers.get('content-type', '')
+            if content_type.startswith(_FORM_CONTENT_TYPES):
+                try:
                     form = await request.form()
                     submitted_token = form.get('csrf_token', '')
-            except:
-                pass
+                except:
+                    pass
 
         if not submitted_token:
             return False
 
         try:
             # Verify both tokens are valid (signed correctly)
-            cookie_data = self.csrf_serializer.loads(cookie_token, max_age=3600)
-            submitted_data = self.csrf_serializer.loads(submitted_token, max_age=3600)
+            cookie_data, _ = self._load_csrf_token(cookie_token)
+            submitted_data, _ = self._load_csrf_token(submitted_token)
 
-            # They must match
-            return cookie_data == submitted_data
+            # They must match (constant-time comparison)
+            return secrets.compare_digest(str(cookie_data), str(submitted_data))
         except BadSignature:
             return False
 
+    def _load_csrf_token(self, token: str) -> Tuple[str, float]:
+        """
+        Verify a signed CSRF token, remembering recent results.
+
+        A cached token is still rejected once its own signature timestamp
+        is older than CSRF_MAX_AGE_SECONDS, exactly as loads() would.
+
+        Args:
+            token: Signed token from the cookie or the request
+
+        Returns:
+            Tuple of (token payload, signing time as unix timestamp)
+
+        Raises:
+            BadSignature: If the token is invalid or expired
+        """
+        cache = self._csrf_verify_cache
+        cached = cache.get(token)
+        if cached is not None:
+            signed_at, payload = cached
+            if time.time() - signed_at < CSRF_MAX_AGE_SECONDS:
+                cache.move_to_end(token)
+                return payload, signed_at
+            del cache[token]
+
+        payload, signed_dt = self.csrf_serializer.loads(
+            token, max_age=CSRF_MAX_AGE_SECONDS, return_timestamp=True
+        )
+        signed_at = signed_dt.timestamp()
+        cache[token] = (signed_at, payload)
+        if len(cache) > _CSRF_VERIFY_CACHE_SIZE:
+            cache.popitem(last=False)
+        return payload, signed_at
+
     def _check_session(self, request: Request) -> bool:
         """
         Check if session is still valid based on TTL.
 
+        Stores the valid session's age in request.state.session_age_seconds.
+
         Args:
             request: Starlette request object
 
@@ -180,10 +285,12 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             return True
 
         try:
-            session_data = self.session_serializer.loads(
+            _, signed_at = self.session_serializer.loads(
                 session_cookie,
-                max_age=self.settings.session_ttl_minutes * 60
+                max_age=self.settings.session_ttl_minutes * 60,
+                return_timestamp=True
             )
+            request.state.session_age_seconds = time.time() - signed_at.timestamp()
             return True
         except BadSignature:
             return False
@@ -193,12 +300,23 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         Set/refresh CSRF token cookie.
 
         Token is stored in 'csrf' cookie and also made available
-        to the request state for template rendering.
+        to the request state for template rendering. A valid cookie
+        younger than CSRF_REFRESH_AFTER_SECONDS is kept as is.
 
         Args:
             response: Starlette response object
             request: Optional request object to store token in state
         """
+        existing_token = request.cookies.get('csrf', '') if request else ''
+        if existing_token:
+            try:
+                _, signed_at = self._load_csrf_token(existing_token)
+                if time.time() - signed_at < CSRF_REFRESH_AFTER_SECONDS:
+                    request.state.csrf_token = existing_token
+                    return
+            except BadSignature:
+                pass
+
         token_value = secrets.token_hex(32)
         signed_token = self.csrf_serializer.dumps(token_value)
 
@@ -208,22 +326,32 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             httponly=False,  # JS needs to read this for fetch requests
             secure=True,
             samesite='lax',  # Lax for form POSTs to work
-            max_age=3600
+            max_age=CSRF_MAX_AGE_SECONDS
         )
 
         # Store token in request state for template access
         if request:
             request.state.csrf_token = signed_token
 
-    def _update_session(self, response: Response) -> None:
+    def _update_session(self, response: Response, request: Request = None) -> None:
         """
-        Update session cookie with current timestamp.
+        Update session cookie.
+
+        The payload is a constant marker: itsdangerous embeds the signing
+        timestamp, which _check_session enforces via max_age. A valid
+        session younger than SESSION_REFRESH_FRACTION of the TTL is not
+        re-issued.
 
         Args:
             response: Starlette response object
+            request: Optional request object carrying the session age
         """
-        session_data = {'last_seen': datetime.utcnow().isoformat()}
-        signed_session = self.session_serializer.dumps(session_data)
+        ttl_seconds = self.settings.session_ttl_minutes * 60
+        session_age = getattr(request.state, 'session_age_seconds', None) if request else None
+        if session_age is not None and session_age < ttl_seconds * SESSION_REFRESH_FRACTION:
+            return
+
+        signed_session = self.session_serializer.dumps('1')
 
         response.set_cookie(
             key='session',
@@ -231,7 +359,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             httponly=True,
             secure=True,
             samesite='strict',
-            max_age=self.settings.session_ttl_minutes * 60
+            max_age=ttl_seconds
         )
 
     def _add_security_headers(self, response: Response) -> None:
@@ -241,16 +369,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         Args:
             response: Starlette response object
         """
-        headers = MutableHeaders(response.headers)
-
-        headers['Content-Security-Policy'] = "default-src 'self'; style-src 'self' 'unsafe-inline'; script-src 'self' 'unsafe-inline'; frame-ancestors 'none';"
-        headers['X-Frame-Options'] = 'DENY'
-        headers['Referrer-Policy'] = 'no-referrer'
-        headers['Strict-Transport-Security'] = 'max-age=31536000'
-        headers['X-Content-Type-Options'] = 'nosniff'
-        headers['X-XSS-Protection'] = '1; mode=block'
-
-        response.headers.update(headers)
+        response.headers.update(_SECURITY_HEADERS)
 
 
 def extract_actor(request: Request) -> str:
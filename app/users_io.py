@@ -10,19 +10,28 @@ Provides:
 """
 import os
 import shutil
+from contextlib import contextmanager
 import yaml
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
 import logging
 import tempfile
 import portalocker
 
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader, SafeDumper
+
 from config import Settings
 from models import UserConfig, UsersFile
 
 logger = logging.getLogger(__name__)
 
+# ioctl request to reflink (copy-on-write clone) a file on btrfs/xfs
+FICLONE = 0x40049409
+
 
 class UsersFileHandler:
     """Handler for Authelia users.yml file operations."""
@@ -39,37 +48,73 @@ class UsersFileHandler:
         self.backup_dir = Path(settings.backup_dir)
         self.lock_file_path = Path(settings.authelia_users_file).with_suffix('.lock')
 
+        # Last loaded/saved users keyed on the file's (mtime_ns, size),
+        # plus whether they went through Pydantic validation
+        self._cache: Optional[Tuple[int, int, UsersFile, bool]] = None
+
+        # Admin usernames for one UsersFile instance (matched by identity);
+        # add_user/delete_user carry it over to the file they produce
+        self._admin_index: Optional[Tuple[UsersFile, FrozenSet[str]]] = None
+
+        # Uncommitted state while inside transaction()
+        self._pending: Optional[UsersFile] = None
+        self._txn_depth = 0
+
         # Ensure backup directory exists
         self.backup_dir.mkdir(parents=True, exist_ok=True)
 
-    def load_users(self) -> UsersFile:
+    def load_users(self, validate: bool = True) -> UsersFile:
         """
         Load and parse users.yml file.
 
+        The parsed result is cached until the file's mtime or size changes.
+        It is shared between callers, so treat it as read-only.
+
+        Args:
+            validate: Run Pydantic validation. Read-only callers may pass
+                False to build models without validation; anything that
+                writes the file back must keep the default.
+
         Returns:
-            UsersFile object with validated users
+            UsersFile object (validated unless validate=False)
 
         Raises:
             FileNotFoundError: If users file doesn't exist
             ValueError: If YAML is invalid or validation fails
         """
-        if not self.users_file_path.exists():
+        try:
+            stat = self.users_file_path.stat()
+        except FileNotFoundError:
             logger.warning(f"Users file not found: {self.users_file_path}")
+            self._cache = None
             return UsersFile(users={})
 
+        if (self._cache and self._cache[:2] == (stat.st_mtime_ns, stat.st_size)
+                and (self._cache[3] or not validate)):
+            return self._cache[2]
+
         try:
             with open(self.users_file_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
+                data = yaml.load(f, Loader=SafeLoader)
 
             if not data:
-                return UsersFile(users={})
+                users_file = UsersFile(users={})
+                self._cache = (stat.st_mtime_ns, stat.st_size, users_file, True)
+                return users_file
 
             if 'users' not in data or not isinstance(data['users'], dict):
                 raise ValueError("Invalid users.yml format: missing or invalid 'users' key")
 
-            # Validate structure using Pydantic model
-            users_file = UsersFile(users=data['users'])
+            if validate:
+                # Validate structure using Pydantic model
+                users_file = UsersFile(users=data['users'])
+            else:
+                users_file = UsersFile.model_construct(users={
+                    username: UserConfig.model_construct(**config)
+                    for username, config in data['users'].items()
+                })
 
+            self._cache = (stat.st_mtime_ns, stat.st_size, users_file, validate)
             logger.info(f"Loaded {len(users_file.users)} users from {self.users_file_path}")
             return users_file
 
@@ -80,22 +125,24 @@ class UsersFileHandler:
             logger.error(f"Error loading users file: {e}")
             raise
 
-    def save_users(self, users_file: UsersFile, create_backup: bool = True) -> None:
+    def save_users(self, users_file: UsersFile, create_backup: bool = True, prune: bool = True) -> None:
         """
         Save users to file atomically with optional backup.
 
         Process:
-        0. Acquire exclusive file lock
+        0. Acquire exclusive file lock; serialize users and return early
+           if the file already holds exactly these bytes
         1. Create backup of current file (if exists and requested)
         2. Write to temporary file
         3. fsync to ensure data is written
         4. Atomic rename to target path
-        5. Prune old backups
+        5. Prune old backups (unless the caller defers it to prune_backups())
         6. Release lock
 
         Args:
             users_file: UsersFile object to save
             create_backup: Whether to create backup before writing
+            prune: Whether to prune old backups now
 
         Raises:
             IOError: If write fails
@@ -103,6 +150,31 @@ class UsersFileHandler:
         # Acquire exclusive lock for the duration of the write operation
         with portalocker.Lock(self.lock_file_path, 'w', timeout=30) as lock_fh:
             try:
+                # Convert to YAML-friendly dict (fixed field order: same users -> same bytes)
+                data = {'users': {}}
+                for username, user_config in users_file.users.items():
+                    data['users'][username] = {
+                        'password': user_config.password,
+                        'displayname': user_config.displayname,
+                        'email': user_config.email,
+                        'groups': list(user_config.groups)
+                    }
+
+                payload = yaml.dump(
+                    data, Dumper=SafeDumper, default_flow_style=False,
+                    sort_keys=False, encoding='utf-8'
+                )
+
+                # Step 0: Skip backup, write and prune when nothing would change
+                try:
+                    unchanged = self.users_file_path.read_bytes() == payload
+                except FileNotFoundError:
+                    unchanged = False
+                if unchanged:
+                    self._cache_saved(users_file, data)
+                    logger.info(f"{self.users_file_path} unchanged; skipping write")
+                    return
+
                 # Step 1: Create backup
                 if create_backup and self.users_file_path.exists():
                     self._create_backup()
@@ -115,30 +187,27 @@ class UsersFileHandler:
                 )
 
                 try:
-                    # Convert to YAML-friendly dict
-                    data = {'users': {}}
-                    for username, user_config in users_file.users.items():
-                        data['users'][username] = {
-                            'password': user_config.password,
-                            'displayname': user_config.displayname,
-                            'email': user_config.email,
-                            'groups': user_config.groups
-                        }
-
-                    # Write YAML
-                    with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
-                        yaml.dump(data, f, default_flow_style=False, sort_keys=False)
-                        f.flush()
+                    # Write the serialized payload in a single syscall (looping only on short writes)
+                    try:
+                        view = memoryview(payload)
+                        while view:
+                            view = view[os.write(temp_fd, view):]
                         # Step 3: fsync to ensure data is on disk
-                        os.fsync(f.fileno())
+                        os.fsync(temp_fd)
+                    finally:
+                        os.close(temp_fd)
 
                     # Step 4: Atomic rename
                     os.replace(temp_path, self.users_file_path)
 
+                    # What we just wrote is the current file content
+                    self._cache_saved(users_file, data)
+
                     logger.info(f"Successfully saved {len(users_file.users)} users to {self.users_file_path}")
 
                 except Exception as e:
                     # Clean up temp file on error
+                    self._cache = None
                     try:
                         os.unlink(temp_path)
                     except:
@@ -146,20 +215,100 @@ class UsersFileHandler:
                     raise
 
                 # Step 5: Prune old backups
-                if create_backup:
-                    self._prune_backups()
+                if create_backup and prune:
+                    self.prune_backups()
 
             except Exception as e:
                 logger.error(f"Error saving users file: {e}")
                 raise IOError(f"Failed to save users file: {e}")
 
+    def _cache_saved(self, users_file: UsersFile, data: Dict) -> None:
+        """
+        Cache a handler-owned copy of the users just written.
+
+        The copy is built from the serialized data with this module's
+        models, so callers keep ownership of (and may mutate) the object
+        they saved without desyncing the cache from disk. An admin index
+        built for users_file is carried over to the copy.
+
+        Args:
+            users_file: UsersFile that was saved
+            data: The {'users': {...}} dict it was serialized from
+        """
+        stat = self.users_file_path.stat()
+        saved = UsersFile.model_construct(users={
+            username: UserConfig.model_construct(**config)
+            for username, config in data['users'].items()
+        })
+        self._cache = (stat.st_mtime_ns, stat.st_size, saved, True)
+
+        index = self._admin_index
+        if index is not None and index[0] is users_file:
+            self._admin_index = (saved, index[1])
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Batch several add_user/delete_user calls into a single save.
+
+        Changes are kept in memory and written (with one backup) when the
+        outermost block exits normally; they are discarded on exception.
+
+        Raises:
+            IOError: If the final write fails
+        """
+        if self._txn_depth == 0:
+            self._pending = None
+        self._txn_depth += 1
+        try:
+            yield
+        except BaseException:
+            if self._txn_depth == 1:
+                self._pending = None
+            raise
+        finally:
+            self._txn_depth -= 1
+
+        if self._txn_depth == 0 and self._pending is not None:
+            pending, self._pending = self._pending, None
+            self.save_users(pending, create_backup=True)
+
+    def _get_state(self) -> UsersFile:
+        """Current users: uncommitted transaction state or the loaded file."""
+        if self._pending is not None:
+            return self._pending
+        return self.load_users()
+
+    def _admins(self, users_file: UsersFile) -> FrozenSet[str]:
+        """Usernames in the admin group, rebuilt only for a new UsersFile."""
+        index = self._admin_index
+        if index is not None and index[0] is users_file:
+            return index[1]
+
+        # Stored groups are lowercase
+        admin_group = self.settings.admin_group_lower
+        admins = frozenset(
+            username for username, user in users_file.users.items()
+            if admin_group in user.groups
+        )
+        self._admin_index = (users_file, admins)
+        return admins
+
+    def _commit(self, users_file: UsersFile, prune: bool) -> None:
+        """Save users now, or defer to the end of the enclosing transaction."""
+        if self._txn_depth:
+            self._pending = users_file
+        else:
+            self.save_users(users_file, create_backup=True, prune=prune)
+
     def add_user(
         self,
         username: str,
         email: str,
         displayname: str,
         password_hash: str,
-        groups: List[str]
+        groups: List[str],
+        prune: bool = True
     ) -> None:
         """
         Add a new user to the users file.
@@ -170,12 +319,14 @@ class UsersFileHandler:
             displayname: Display name
             password_hash: Bcrypt password hash
             groups: List of group names
+            prune: Prune old backups now (False: caller runs prune_backups())
 
         Raises:
             ValueError: If user already exists or validation fails
             IOError: If write fails
         """
-        users_file = self.load_users()
+        users_file = self._get_state()
+        admins = self._admins(users_file)
 
         if username in users_file.users:
             raise ValueError(f"User '{username}' already exists")
@@ -194,13 +345,20 @@ class UsersFileHandler:
             groups=groups
         )
 
-        users_file.users[username] = new_user
+        # Build a new UsersFile: the loaded one is the shared cached instance
+        users = dict(users_file.users)
+        users[username] = new_user
+        new_file = UsersFile(users=users)
+
+        if self.settings.admin_group_lower in new_user.groups:
+            admins = admins | {username}
+        self._admin_index = (new_file, admins)
 
-        self.save_users(users_file, create_backup=True)
+        self._commit(new_file, prune)
 
         logger.info(f"Added user '{username}' with groups: {groups}")
 
-    def delete_user(self, username: str) -> None:
+    def delete_user(self, username: str, prune: bool = True) -> None:
         """
         Delete a user from the users file.
 
@@ -208,35 +366,31 @@ class UsersFileHandler:
 
         Args:
             username: Username to delete
+            prune: Prune old backups now (False: caller runs prune_backups())
 
         Raises:
             ValueError: If user doesn't exist or is last admin
             IOError: If write fails
         """
-        users_file = self.load_users()
+        users_file = self._get_state()
 
         if username not in users_file.users:
             raise ValueError(f"User '{username}' does not exist")
 
         # Check if this is the last admin
-        admin_group = self.settings.admin_group
-        user_groups = users_file.users[username].groups
-
-        if admin_group in user_groups:
-            # Count total admins
-            admin_count = sum(
-                1 for user in users_file.users.values()
-                if admin_group in user.groups
+        admins = self._admins(users_file)
+        if username in admins and len(admins) <= 1:
+            raise ValueError(
+                f"Cannot delete last admin user. Admin group: '{self.settings.admin_group}'"
             )
 
-            if admin_count <= 1:
-                raise ValueError(
-                    f"Cannot delete last admin user. Admin group: '{admin_group}'"
-                )
+        users = dict(users_file.users)
+        del users[username]
+        new_file = UsersFile(users=users)
 
-        del users_file.users[username]
+        self._admin_index = (new_file, admins - {username})
 
-        self.save_users(users_file, create_backup=True)
+        self._commit(new_file, prune)
 
         logger.info(f"Deleted user '{username}'")
 
@@ -250,17 +404,19 @@ class UsersFileHandler:
         Returns:
             UserConfig if found, None otherwise
         """
-        users_file = self.load_users()
+        users_file = self.load_users(validate=False)
         return users_file.users.get(username)
 
     def list_users(self) -> Dict[str, UserConfig]:
         """
         Get all users.
 
+        Returns the cached mapping; callers must not modify it.
+
         Returns:
             Dictionary mapping usernames to UserConfig objects
         """
-        users_file = self.load_users()
+        users_file = self.load_users(validate=False)
         return users_file.users
 
     def _create_backup(self) -> Path:
@@ -276,34 +432,65 @@ class UsersFileHandler:
         if not self.users_file_path.exists():
             raise IOError("Cannot backup: users file does not exist")
 
-        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        # Microseconds keep names unique and lexicographically chronological
+        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')
         backup_name = f"users.yml.bak.{timestamp}"
         backup_path = self.backup_dir / backup_name
 
         try:
-            shutil.copy2(self.users_file_path, backup_path)
+            self._link_or_copy(self.users_file_path, backup_path)
             logger.info(f"Created backup: {backup_path}")
             return backup_path
         except Exception as e:
             logger.error(f"Failed to create backup: {e}")
             raise IOError(f"Backup creation failed: {e}")
 
-    def _prune_backups(self) -> None:
+    @staticmethod
+    def _link_or_copy(src: Path, dst: Path) -> None:
+        """
+        Snapshot src at dst without copying data where possible.
+
+        Tries a hardlink (save_users replaces users.yml with a new inode, so
+        the link keeps the old content), then a reflink, then shutil.copy2.
+
+        Args:
+            src: File to back up
+            dst: Backup path (must not exist)
+        """
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass  # e.g. EXDEV (backup dir on another filesystem) or EPERM
+
+        try:
+            import fcntl
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return
+        except (ImportError, OSError):
+            pass
+
+        shutil.copy2(src, dst)
+
+    def prune_backups(self) -> None:
         """
         Remove old backups, keeping only the most recent BACKUP_KEEP files.
         """
         try:
-            # Find all backup files
-            backups = sorted(
-                self.backup_dir.glob('users.yml.bak.*'),
-                key=lambda p: p.stat().st_mtime,
-                reverse=True
-            )
+            # Backup names embed a UTC timestamp, so name order is age order
+            with os.scandir(self.backup_dir) as entries:
+                names = [e.name for e in entries if e.name.startswith('users.yml.bak.')]
+            names.sort(reverse=True)
 
             # Remove excess backups
-            for backup in backups[self.settings.backup_keep:]:
-                backup.unlink()
-                logger.info(f"Pruned old backup: {backup}")
+            for name in names[self.settings.backup_keep:]:
+                try:
+                    os.unlink(self.backup_dir / name)
+                except FileNotFoundError:
+                    continue
+                logger.info(f"Pruned old backup: {self.backup_dir / name}")
 
         except Exception as e:
             logger.warning(f"Error pruning backups: {e}")
@@ -319,12 +506,17 @@ def validate_no_duplicate_emails(users_file: UsersFile) -> None:
     Raises:
         ValueError: If duplicate emails found
     """
+    # Fast path: no duplicates (the common case) needs only one set build
+    folded = [user.email.casefold() for user in users_file.users.values()]
+    if len(set(folded)) == len(folded):
+        return
+
+    # Slow path: find the first duplicate for the error message
     emails = {}
-    for username, user in users_file.users.items():
-        email_lower = user.email.lower()
-        if email_lower in emails:
+    for (username, user), email_folded in zip(users_file.users.items(), folded):
+        if email_folded in emails:
             raise ValueError(
                 f"Duplicate email '{user.email}' for users "
-                f"'{emails[email_lower]}' and '{username}'"
+                f"'{emails[email_folded]}' and '{username}'"
             )
-        emails[email_lower] = username
+        emails[email_folded] = username
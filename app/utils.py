@@ -1,51 +1,237 @@
 """
 Utility functions for Authelia User Management GUI
 """
+import atexit
+import logging
+import os
+import re
 import secrets
+import select
+import shlex
 import string
+import subprocess
+import threading
+import time
+from typing import Optional
 from passlib.hash import argon2
 
+from config import get_settings
+
+try:
+    from argon2 import PasswordHasher, Type
+except ImportError:  # argon2-cffi missing: hash_password falls back to passlib
+    PasswordHasher = None
+
+logger = logging.getLogger(__name__)
+
+# Argon2id cost from ARGON2_ITERATIONS / ARGON2_MEMORY_KIB / ARGON2_LANES
+# (defaults match Authelia's: t=3, m=64 MiB, p=4)
+_settings = get_settings()
+_ARGON2_ITERATIONS = _settings.argon2_iterations
+_ARGON2_MEMORY_KIB = _settings.argon2_memory_kib
+_ARGON2_LANES = _settings.argon2_lanes
+
+# Argon2id hasher with a 32-byte key and 16-byte salt, as Authelia generates
+_PH = PasswordHasher(
+    time_cost=_ARGON2_ITERATIONS,
+    memory_cost=_ARGON2_MEMORY_KIB,
+    parallelism=_ARGON2_LANES,
+    hash_len=32,
+    salt_len=16,
+    type=Type.ID
+) if PasswordHasher is not None else None
+
+# passlib fallback handler with the same parameters, configured once
+_ARGON2_HASHER = argon2.using(
+    type='ID',
+    rounds=_ARGON2_ITERATIONS,
+    salt_size=16,
+    parallelism=_ARGON2_LANES,
+    memory_cost=_ARGON2_MEMORY_KIB
+)
+
+# Hash line in `authelia crypto hash generate` output ("Digest: $argon2id$...")
+_DIGEST_RE = re.compile(r'Digest:\s+(\$argon2id\$\S+)')
+
+# local@domain.tld: one "@", a dot in the domain part, no whitespace
+_EMAIL_RE = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+
+# Allowed username characters, and those not allowed at either end
+_USERNAME_CHARS = frozenset(string.ascii_lowercase + string.digits + '-_')
+_USERNAME_EDGE_CHARS = frozenset('-_')
+# Every rule below in one pattern: valid names are accepted in a single match
+_USERNAME_RE = re.compile(r'[a-z0-9][a-z0-9_-]{0,30}[a-z0-9]')
+
+# Password character sets (uppercase, lowercase, digits, special) and their union
+_PASSWORD_CHARSETS = (
+    string.ascii_uppercase,
+    string.ascii_lowercase,
+    string.digits,
+    "!@#$%^&*()-_=+[]{}|;:,.<>?"
+)
+_PASSWORD_ALPHABET = ''.join(_PASSWORD_CHARSETS)
+_PASSWORD_MASK = 127  # Smallest 2**n - 1 covering every alphabet index
+
+# OS-entropy generator, created once and reused for every password
+_SYSRAND = secrets.SystemRandom()
+
 
 def generate_secure_password(length: int = 16) -> str:
     """
     Generate a secure random password
 
+    Characters are rejection-sampled from one bulk random draw; one
+    character of each set is then placed at random distinct positions.
+
     Args:
-        length: Length of the password (default: 16)
+        length: Length of the password (default: 16, at least 4)
 
     Returns:
         Randomly generated password
     """
-    # Define character sets
-    uppercase = string.ascii_uppercase
-    lowercase = string.ascii_lowercase
-    digits = string.digits
-    special = "!@#$%^&*()-_=+[]{}|;:,.<>?"
+    alphabet_size = len(_PASSWORD_ALPHABET)
+    password = []
+    while len(password) < length:
+        for b in secrets.token_bytes(length * 2):
+            i = b & _PASSWORD_MASK
+            if i < alphabet_size:
+                password.append(_PASSWORD_ALPHABET[i])
+                if len(password) == length:
+                    break
 
     # Ensure at least one character from each set
-    password = [
-        secrets.choice(uppercase),
-        secrets.choice(lowercase),
-        secrets.choice(digits),
-        secrets.choice(special)
-    ]
+    positions = _SYSRAND.sample(range(length), len(_PASSWORD_CHARSETS))
+    for position, charset in zip(positions, _PASSWORD_CHARSETS):
+        password[position] = _SYSRAND.choice(charset)
 
-    # Fill the rest with random characters from all sets
-    all_characters = uppercase + lowercase + digits + special
-    password.extend(secrets.choice(all_characters) for _ in range(length - 4))
+    return ''.join(password)
 
-    # Shuffle to avoid predictable patterns
-    secrets.SystemRandom().shuffle(password)
 
-    return ''.join(password)
+class HashWorker:
+    """
+    Persistent `docker exec -i` shell running Authelia's hash generator
+
+    Passwords are written one per line to the shell's stdin; each hash is
+    followed by a sentinel line so failures cannot stall the reader. The
+    shell is started on first use and restarted if it has exited.
+    """
+
+    SENTINEL = b'__authelia_gui_hash_done__'
+
+    def __init__(self, container: str, config_file: str, timeout: float = 10.0):
+        """
+        Initialize the worker; the shell is started lazily
+
+        Args:
+            container: Name of the Authelia container
+            config_file: Authelia configuration path inside the container
+            timeout: Seconds to wait for a single hash
+        """
+        self.container = container
+        self.config_file = config_file
+        self.timeout = timeout
+        self.proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        script = (
+            'while IFS= read -r pw; do '
+            'authelia crypto hash generate argon2 --password "$pw" '
+            f'--config {shlex.quote(self.config_file)} 2>&1; '
+            f'echo {self.SENTINEL.decode()}; '
+            'done'
+        )
+        self.proc = subprocess.Popen(
+            ['docker', 'exec', '-i', self.container, 'sh', '-c', script],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+
+    def _read_response(self) -> bytes:
+        fd = self.proc.stdout.fileno()
+        deadline = time.monotonic() + self.timeout
+        buffer = b''
+        while self.SENTINEL not in buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise TimeoutError("Authelia CLI did not answer in time")
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                raise EOFError("Authelia CLI shell exited")
+            buffer += chunk
+        return buffer
+
+    def hash(self, password: str) -> Optional[str]:
+        """
+        Hash a password with the Authelia CLI
+
+        Args:
+            password: Plain text password (must not contain line breaks)
+
+        Returns:
+            Argon2id hash, or None if the CLI could not produce one
+        """
+        if '\n' in password or '\r' in password:
+            return None
+
+        with self._lock:
+            try:
+                if self.proc is None or self.proc.poll() is not None:
+                    self._start()
+                self.proc.stdin.write(password.encode() + b'\n')
+                self.proc.stdin.flush()
+                output = self._read_response().decode(errors='replace')
+            except (OSError, EOFError, TimeoutError) as e:
+                logger.warning(f"Authelia CLI hash worker failed: {e}")
+                self.close()
+                return None
+
+        match = _DIGEST_RE.search(output)
+        if not match:
+            logger.warning(f"Authelia CLI hash generation failed: {output.strip()}")
+            return None
+        return match.group(1)
+
+    def close(self):
+        """Terminate the docker exec shell if it is running"""
+        proc, self.proc = self.proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+
+_hash_worker: Optional[HashWorker] = None
+_hash_worker_lock = threading.Lock()
+
+
+def get_hash_worker() -> HashWorker:
+    """
+    Get the process-wide Authelia CLI hash worker
+
+    Returns:
+        Shared HashWorker, closed automatically at interpreter exit
+    """
+    global _hash_worker
+    with _hash_worker_lock:
+        if _hash_worker is None:
+            _hash_worker = HashWorker(_settings.authelia_container, _settings.authelia_config_file)
+            atexit.register(_hash_worker.close)
+        return _hash_worker
 
 
 def hash_password(password: str) -> str:
     """
-    Hash a password using Authelia's CLI to ensure compatibility
+    Hash a password with Argon2id in the format Authelia expects
 
-    Calls Authelia's own crypto hash generator to create hashes
-    that are guaranteed to work with Authelia's authentication.
+    Hashes in-process with argon2-cffi using the configured cost
+    (Authelia's defaults unless overridden); the result is a standard
+    PHC "$argon2id$..." string. With AUTHELIA_CLI_HASHING enabled the
+    Authelia CLI generates it instead, through a persistent shell.
 
     Args:
         password: Plain text password to hash
@@ -53,50 +239,17 @@ def hash_password(password: str) -> str:
     Returns:
         Argon2id hashed password compatible with Authelia
     """
-    import subprocess
-    import re
-    import os
-
-    try:
-        # Call Authelia CLI via docker exec
-        # This ensures hash compatibility with Authelia's Go implementation
-        cmd = [
-            'docker', 'exec', 'authelia',
-            'authelia', 'crypto', 'hash', 'generate', 'argon2',
-            '--password', password,
-            '--config', '/config/configuration.yml'
-        ]
-
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-
-        if result.returncode == 0:
-            # Extract hash from output like "Digest: $argon2id$..."
-            match = re.search(r'Digest:\s+(\$argon2id\$[^\s]+)', result.stdout)
-            if match:
-                return match.group(1)
-
-        # Fallback to passlib if Authelia CLI fails
-        # (This will still have compatibility issues but better than failing)
-        import logging
-        logging.warning(f"Authelia CLI hash generation failed, falling back to passlib: {result.stderr}")
+    if _settings.authelia_cli_hashing:
+        digest = get_hash_worker().hash(password)
+        if digest is not None:
+            return digest
+        logger.warning("Falling back to in-process Argon2id hashing")
 
-    except Exception as e:
-        import logging
-        logging.warning(f"Could not call Authelia CLI for hash generation: {e}, falling back to passlib")
+    if _PH is not None:
+        return _PH.hash(password)
 
-    # Fallback: use passlib (may have compatibility issues)
-    return argon2.using(
-        type='ID',
-        rounds=3,
-        salt_size=16,
-        parallelism=4,
-        memory_cost=65536
-    ).hash(password)
+    # Fallback: use passlib when argon2-cffi is not importable directly
+    return _ARGON2_HASHER.hash(password)
 
 
 def validate_username(username: str) -> tuple[bool, str]:
@@ -109,23 +262,28 @@ def validate_username(username: str) -> tuple[bool, str]:
     Returns:
         Tuple of (is_valid, error_message)
     """
+    if _USERNAME_RE.fullmatch(username):
+        return True, ""
+
+    # Invalid: find which rule failed for the error message
     if not username:
         return False, "Username cannot be empty"
 
-    if len(username) < 3:
-        return False, "Username must be at least 3 characters long"
+    if len(username) < 2:
+        return False, "Username must be at least 2 characters long"
 
     if len(username) > 32:
         return False, "Username must be at most 32 characters long"
 
     # Check for valid characters (lowercase letters, numbers, hyphens, underscores)
-    if not all(c in string.ascii_lowercase + string.digits + '-_' for c in username):
+    if not _USERNAME_CHARS.issuperset(username):
         return False, "Username can only contain lowercase letters, numbers, hyphens, and underscores"
 
-    if username[0] in '-_' or username[-1] in '-_':
+    if username[0] in _USERNAME_EDGE_CHARS or username[-1] in _USERNAME_EDGE_CHARS:
         return False, "Username cannot start or end with hyphen or underscore"
 
-    return True, ""
+    # The pattern rejected it even though no rule above did: fail closed
+    return False, "Invalid username"
 
 
 def validate_email(email: str) -> tuple[bool, str]:
@@ -141,7 +299,7 @@ def validate_email(email: str) -> tuple[bool, str]:
     if not email:
         return False, "Email cannot be empty"
 
-    if '@' not in email or '.' not in email.split('@')[-1]:
+    if not _EMAIL_RE.fullmatch(email):
         return False, "Invalid email format"
 
     return True, ""
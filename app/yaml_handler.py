@@ -2,14 +2,45 @@
 YAML file operations for Authelia users.yml
 """
 import yaml
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 import os
 import shutil
+import threading
 from datetime import datetime
 
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader, SafeDumper
+
 logger = logging.getLogger(__name__)
 
+# Column name -> (users.yml field, default) for the per-field user columns
+_COLUMN_FIELDS = {
+    'emails': ('email', ''),
+    'displaynames': ('displayname', ''),
+    'groups': ('groups', []),
+    'password_hashes': ('password', ''),
+}
+
+
+def _build_columns(users: Dict) -> Dict[str, List]:
+    """
+    Split users into parallel per-field lists
+
+    Args:
+        users: Parsed users mapping (username -> config)
+
+    Returns:
+        Dict of equally long lists keyed by column name, plus 'usernames'
+    """
+    configs = list(users.values())
+    columns = {'usernames': list(users)}
+    for column, (field, default) in _COLUMN_FIELDS.items():
+        columns[column] = [config.get(field, default) for config in configs]
+    return columns
+
 
 class AutheliaYAMLHandler:
     """Handler for reading and writing Authelia users.yml"""
@@ -22,33 +53,81 @@ class AutheliaYAMLHandler:
             yaml_path: Path to the users.yml file
         """
         self.yaml_path = yaml_path
+        # ((mtime_ns, size), parsed users, per-field columns): re-read only on
+        # change. Kept as one tuple so concurrent readers never pair a new key
+        # with old data.
+        self._cache: Optional[Tuple[Tuple[int, int], Dict, Dict[str, List]]] = None
+        # Serializes read-modify-write cycles (see mutate_users)
+        self._write_lock = threading.Lock()
+
+    def invalidate_cache(self) -> None:
+        """Force the next read to re-parse users.yml"""
+        self._cache = None
 
     def read_users(self) -> Dict:
         """
         Read all users from users.yml
 
+        The parsed result is cached and shared between callers until the
+        file changes; copy it before modifying.
+
         Returns:
             Dictionary of users with their configuration
         """
+        return self._load()[0]
+
+    def get_columns(self) -> Dict[str, List]:
+        """
+        Get users as parallel per-field lists
+
+        Built once per file change; shared between callers, so treat the
+        lists as read-only.
+
+        Returns:
+            Dict with 'usernames', 'emails', 'displaynames', 'groups' and
+            'password_hashes' lists, all in users.yml order
+        """
+        return self._load()[1]
+
+    def get_emails(self) -> List[str]:
+        """
+        Get every user's email address
+
+        Returns:
+            Emails in users.yml order (shared list, do not modify)
+        """
+        return self.get_columns()['emails']
+
+    def _load(self) -> Tuple[Dict, Dict[str, List]]:
+        """Parse users.yml (or reuse the cache) into users and columns"""
         try:
-            with open(self.yaml_path, 'r') as f:
-                data = yaml.safe_load(f)
+            stat = os.stat(self.yaml_path)
+            key = (stat.st_mtime_ns, stat.st_size)
+            cache = self._cache
+            if cache is not None and cache[0] == key:
+                return cache[1], cache[2]
+
+            # Bytes in: the C loader decodes UTF-8 itself
+            with open(self.yaml_path, 'rb') as f:
+                data = yaml.load(f, Loader=SafeLoader)
 
             if not data or 'users' not in data:
                 logger.warning(f"No users found in {self.yaml_path}")
-                return {}
+                users = {}
+            else:
+                users = data['users']
 
-            return data['users']
+            columns = _build_columns(users)
+            self._cache = (key, users, columns)
+            return users, columns
 
         except FileNotFoundError:
             logger.error(f"Users file not found: {self.yaml_path}")
-            return {}
         except yaml.YAMLError as e:
             logger.error(f"Error parsing YAML file: {e}")
-            return {}
         except Exception as e:
             logger.error(f"Unexpected error reading users: {e}")
-            return {}
+        return {}, _build_columns({})
 
     def get_user(self, username: str) -> Optional[Dict]:
         """
@@ -70,20 +149,20 @@ class AutheliaYAMLHandler:
         Returns:
             List of user dictionaries with username field added
         """
-        users = self.read_users()
-        users_list = []
-
-        for username, config in users.items():
-            user_dict = {
+        columns = self.get_columns()
+        return [
+            {
                 'username': username,
-                'email': config.get('email', ''),
-                'displayname': config.get('displayname', ''),
-                'groups': config.get('groups', []),
-                'password_hash': config.get('password', '')
+                'email': email,
+                'displayname': displayname,
+                'groups': groups,
+                'password_hash': password_hash
             }
-            users_list.append(user_dict)
-
-        return users_list
+            for username, email, displayname, groups, password_hash in zip(
+                columns['usernames'], columns['emails'], columns['displaynames'],
+                columns['groups'], columns['password_hashes']
+            )
+        ]
 
     def backup_users_file(self) -> str:
         """
@@ -107,6 +186,8 @@ class AutheliaYAMLHandler:
         """
         Write users dictionary to users.yml with proper YAML formatting
 
+        Writes a temp file, fsyncs it and renames it over users.yml.
+
         Args:
             users_dict: Dictionary of users to write
             create_backup: Whether to create a backup before writing
@@ -118,27 +199,38 @@ class AutheliaYAMLHandler:
             if create_backup:
                 self.backup_users_file()
 
-            # Write YAML manually matching alexbeav format
-            # (no quotes, with email field)
-            with open(self.yaml_path, 'w') as f:
-                f.write('users:\n')
-                for username, config in users_dict.items():
-                    f.write(f'  {username}:\n')
-                    # Password without quotes
-                    password = config.get('password', '')
-                    f.write(f'    password: {password}\n')
-                    # Displayname without quotes
-                    displayname = config.get('displayname', '')
-                    f.write(f'    displayname: {displayname}\n')
-                    # Email field (required)
-                    email = config.get('email', '')
-                    f.write(f'    email: {email}\n')
-                    # Groups
-                    groups = config.get('groups', [])
-                    f.write('    groups:\n')
-                    for group in groups:
-                        f.write(f'    - {group}\n')
-
+            # Fixed field order per user (email is required by Authelia);
+            # the dumper quotes only values that need it
+            data = {'users': {
+                username: {
+                    'password': config.get('password', ''),
+                    'displayname': config.get('displayname', ''),
+                    'email': config.get('email', ''),
+                    'groups': list(config.get('groups', []))
+                }
+                for username, config in users_dict.items()
+            }}
+            payload = yaml.dump(
+                data, Dumper=SafeDumper, default_flow_style=False,
+                sort_keys=False, allow_unicode=True, encoding='utf-8'
+            )
+
+            # Atomic replace: readers see the old or the new file, never a partial one
+            tmp_path = f"{self.yaml_path}.tmp.{os.getpid()}"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.yaml_path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+            self.invalidate_cache()
             logger.info(f"Users file updated: {self.yaml_path}")
             return True
 
@@ -146,6 +238,26 @@ class AutheliaYAMLHandler:
             logger.error(f"Error writing users file: {e}")
             return False
 
+    def mutate_users(self, mutate: Callable[[Dict], bool]) -> bool:
+        """
+        Atomically read, modify and write users.yml
+
+        The callback receives a copy of the cached users dict and may
+        apply any number of changes, which are written in one pass.
+
+        Args:
+            mutate: Callback that modifies the dict in place and returns
+                False to abort without writing
+
+        Returns:
+            True if changes were written, False otherwise
+        """
+        with self._write_lock:
+            users = dict(self.read_users())
+            if not mutate(users):
+                return False
+            return self.write_users(users)
+
     def add_user(self, username: str, email: str, displayname: str,
                  password_hash: str, groups: List[str] = None) -> bool:
         """
@@ -161,9 +273,7 @@ class AutheliaYAMLHandler:
         Returns:
             True if successful, False otherwise
         """
-        try:
-            users = self.read_users()
-
+        def add(users: Dict) -> bool:
             if username in users:
                 logger.error(f"User {username} already exists")
                 return False
@@ -174,8 +284,10 @@ class AutheliaYAMLHandler:
                 'email': email,
                 'groups': groups or []
             }
+            return True
 
-            return self.write_users(users)
+        try:
+            return self.mutate_users(add)
 
         except Exception as e:
             logger.error(f"Error adding user {username}: {e}")
@@ -191,17 +303,17 @@ class AutheliaYAMLHandler:
         Returns:
             True if successful, False otherwise
         """
-        try:
-            users = self.read_users()
-
+        def delete(users: Dict) -> bool:
             if username not in users:
                 logger.error(f"User {username} does not exist")
                 return False
 
             del users[username]
             logger.info(f"Deleting user {username}")
+            return True
 
-            return self.write_users(users)
+        try:
+            return self.mutate_users(delete)
 
         except Exception as e:
             logger.error(f"Error deleting user {username}: {e}")
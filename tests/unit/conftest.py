@@ -0,0 +1,187 @@
+"""
+Shared pytest configuration and fixtures for the unit tests.
+
+The SecurityMiddleware app, its client and the event loop every async
+test runs on are built (and warmed up) once per session and shared by
+every test module that requests them.
+"""
+import ast
+import asyncio
+import os
+from dataclasses import dataclass
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+# Cheapest cost BCRYPT_ROUNDS accepts, so any test that reaches a real
+# hash pays 2^4 Blowfish rounds instead of 2^12. Set at import time: the
+# settings are read when the app modules are imported during collection,
+# before any fixture could run.
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from app.models import UserConfig
+from app.security import SecurityMiddleware, get_serializer
+
+
+ALL_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+
+# Endpoint responses, serialized once: SecurityMiddleware decorates the
+# response it gets back from call_next, never these objects
+OK_RESPONSE = Response(b'{"status":"ok"}', media_type="application/json")
+HEALTH_RESPONSE = Response(b'{"status":"OK"}', media_type="application/json")
+
+
+@dataclass(frozen=True)
+class FrozenSettings:
+    """Immutable stand-in for the Settings fields SecurityMiddleware reads."""
+    admin_group: str = "authelia-admins"
+    admin_group_lower: str = "authelia-admins"
+    admin_groups: frozenset = frozenset({"authelia-admins"})
+    csrf_secret: str = "test-secret-key-32-chars-long!!"
+    csrf_secret_bytes: bytes = b"test-secret-key-32-chars-long!!"
+    session_ttl_minutes: int = 30
+
+
+def pytest_configure(config):
+    """Register the custom markers used by the unit tests."""
+    config.addinivalue_line(
+        "markers", "pure: in-memory tests with no ASGI app, files or event loop"
+    )
+
+
+def _duplicate_definitions(body):
+    """Names defined more than once among the class/function nodes of body."""
+    seen = set()
+    duplicates = []
+    for node in body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.name in seen:
+                duplicates.append(node.name)
+            seen.add(node.name)
+    return duplicates
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Fail collection if a collected test module defines a name twice, and
+    skip benchmarks unless they were asked for.
+
+    A later class, function or method silently replaces the earlier one
+    (and a module pasted into itself would run every test twice).
+    """
+    problems = []
+    for path in sorted({item.path for item in items}):
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        duplicates = _duplicate_definitions(tree.body)
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef):
+                duplicates += [f"{node.name}.{name}" for name in _duplicate_definitions(node.body)]
+        if duplicates:
+            problems.append(f"{path.name} defines {duplicates} more than once")
+
+    if problems:
+        raise pytest.UsageError("Duplicate test definitions:\n" + "\n".join(problems))
+
+    # Benchmarks are opt-in: the default run only checks behaviour
+    if not (config.getoption("benchmark_only", default=False)
+            or config.getoption("benchmark_enable", default=False)):
+        skip = pytest.mark.skip(reason="benchmark: run with --benchmark-only or --benchmark-enable")
+        for item in items:
+            if "benchmark" in getattr(item, "fixturenames", ()):
+                item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def settings():
+    """Create test settings (shared and read-only)."""
+    return FrozenSettings()
+
+
+@pytest.fixture(scope="session")
+def csrf_serializer(settings):
+    """The CSRF serializer SecurityMiddleware itself uses for these settings."""
+    return get_serializer(settings.csrf_secret_bytes, 'csrf')
+
+
+@pytest.fixture(scope="session")
+def csrf_token(csrf_serializer):
+    """A validly signed CSRF token, reusable across tests."""
+    return csrf_serializer.dumps("test-value")
+
+
+@pytest.fixture(scope="session")
+def app(settings):
+    """Build one Starlette app behind SecurityMiddleware for the whole session."""
+    async def endpoint(request: Request):
+        return OK_RESPONSE
+
+    async def health(request: Request):
+        return HEALTH_RESPONSE
+
+    return Starlette(
+        routes=[
+            Route("/", endpoint, methods=["GET"]),
+            Route("/health", health, methods=["GET"]),
+            Route("/users", endpoint, methods=ALL_METHODS),
+            Route("/users/{username}", endpoint, methods=ALL_METHODS),
+        ],
+        middleware=[Middleware(SecurityMiddleware, settings=settings)]
+    )
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One event loop for the whole session (overrides pytest-asyncio's per-test loop)."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def shared_client(app, event_loop):
+    """Async client calling the app in-process, shared by every test."""
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://testserver"
+    )
+    # Warm-up: the first request builds the middleware stack and initialises
+    # the transport, so no test pays that cost; fail here if the app is broken
+    warmup = event_loop.run_until_complete(client.get("/health"))
+    assert warmup.status_code == 200
+    yield client
+    event_loop.run_until_complete(client.aclose())
+
+
+@pytest.fixture
+def client(shared_client):
+    """Shared test client with an empty cookie jar."""
+    shared_client.cookies.clear()
+    return shared_client
+
+
+# Sample users, validated once per session. Tests must not mutate them.
+@pytest.fixture(scope="session")
+def alice_config():
+    """A regular user in the 'users' group."""
+    return UserConfig(
+        password="$2b$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
+        displayname="Alice",
+        email="alice@example.com",
+        groups=["users"]
+    )
+
+
+@pytest.fixture(scope="session")
+def bob_config():
+    """A user in the 'admins' group."""
+    return UserConfig(
+        password="$2b$12$xyzabcdefghijklmnopqrstuvwxyz123456789012345678",
+        displayname="Bob",
+        email="bob@example.com",
+        groups=["admins"]
+    )
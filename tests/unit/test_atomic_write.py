@@ -11,6 +11,7 @@ Tests:
 import pytest
 import tempfile
 import shutil
+import time
 from pathlib import Path
 from unittest.mock import Mock, patch
 from app.config import Settings
@@ -34,6 +35,7 @@ def settings(temp_dir):
     settings.backup_dir = str(temp_dir / "backups")
     settings.backup_keep = 3
     settings.admin_group = "admins"
+    settings.admin_group_lower = "admins"
     return settings
 
 
@@ -68,17 +70,11 @@ class TestAtomicWrite:
         assert "testuser" in loaded.users
         assert loaded.users["testuser"].email == "test@example.com"
 
-    def test_no_partial_write_on_failure(self, users_handler, settings, temp_dir):
+    def test_no_partial_write_on_failure(self, users_handler, settings, temp_dir,
+                                         alice_config, bob_config):
         """Test that failed writes don't leave partial files."""
         # Create initial valid file
-        initial_users = UsersFile(users={
-            "alice": UserConfig(
-                password="$2b$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
-                displayname="Alice",
-                email="alice@example.com",
-                groups=["users"]
-            )
-        })
+        initial_users = UsersFile(users={"alice": alice_config})
         users_handler.save_users(initial_users, create_backup=False)
 
         # Get original content
@@ -86,14 +82,7 @@ class TestAtomicWrite:
 
         # Try to write invalid data (simulate failure during write)
         with patch('os.replace', side_effect=IOError("Simulated failure")):
-            invalid_users = UsersFile(users={
-                "bob": UserConfig(
-                    password="$2b$12$xyzabcdefghijklmnopqrstuvwxyz123456789012345678",
-                    displayname="Bob",
-                    email="bob@example.com",
-                    groups=["admins"]
-                )
-            })
+            invalid_users = UsersFile(users={"bob": bob_config})
 
             with pytest.raises(IOError):
                 users_handler.save_users(invalid_users, create_backup=False)
@@ -108,6 +97,26 @@ class TestAtomicWrite:
         assert "bob" not in loaded.users
 
 
+    def test_cache_does_not_alias_saved_model(self, users_handler):
+        """Mutating a saved model afterwards must not change what load_users returns."""
+        users_file = UsersFile(users={
+            "testuser": UserConfig(
+                password="$2b$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
+                displayname="Test User",
+                email="test@example.com",
+                groups=["users"]
+            )
+        })
+        users_handler.save_users(users_file, create_backup=False)
+
+        users_file.users["testuser"].groups.append("admins")
+        del users_file.users["testuser"]
+
+        loaded = users_handler.load_users()
+        assert loaded is not users_file
+        assert loaded.users["testuser"].groups == ["users"]
+
+
 class TestBackups:
     """Test backup functionality."""
 
@@ -164,7 +173,6 @@ class TestBackups:
                 )
             })
             users_handler.save_users(users, create_backup=True)
-            import time
             time.sleep(0.1)  # Ensure different timestamps
 
         # Verify only BACKUP_KEEP backups remain
@@ -257,6 +265,29 @@ class TestLastAdminProtection:
         assert "user1" not in loaded.users
         assert "admin1" in loaded.users
 
+    def test_admin_index_follows_successive_deletes(self, users_handler):
+        """Test that the second of two admins is protected after the first is deleted."""
+        users = UsersFile(users={
+            "admin1": UserConfig(
+                password="$2b$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
+                displayname="Admin One",
+                email="admin1@example.com",
+                groups=["admins"]
+            ),
+            "admin2": UserConfig(
+                password="$2b$12$xyzabcdefghijklmnopqrstuvwxyz123456789012345678",
+                displayname="Admin Two",
+                email="admin2@example.com",
+                groups=["admins"]
+            )
+        })
+        users_handler.save_users(users, create_backup=False)
+
+        users_handler.delete_user("admin1")
+
+        with pytest.raises(ValueError, match="last admin"):
+            users_handler.delete_user("admin2")
+
 
 class TestAddUser:
     """Test user addition."""
@@ -296,3 +327,48 @@ class TestAddUser:
                 password_hash="$2b$12$xyzabcdefghijklmnopqrstuvwxyz123456789012345678",
                 groups=["users"]
             )
+
+
+class TestTransaction:
+    """Test batching several changes into one save."""
+
+    def test_transaction_saves_once(self, users_handler):
+        """Test that changes inside a transaction are written in a single save."""
+        with patch.object(users_handler, 'save_users', wraps=users_handler.save_users) as mock_save:
+            with users_handler.transaction():
+                users_handler.add_user(
+                    username="alice",
+                    email="alice@example.com",
+                    displayname="Alice",
+                    password_hash="$2b$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
+                    groups=["admins"]
+                )
+                users_handler.add_user(
+                    username="bob",
+                    email="bob@example.com",
+                    displayname="Bob",
+                    password_hash="$2b$12$xyzabcdefghijklmnopqrstuvwxyz123456789012345678",
+                    groups=["users"]
+                )
+                users_handler.delete_user("bob")
+
+            assert mock_save.call_count == 1
+
+        loaded = users_handler.load_users()
+        assert "alice" in loaded.users
+        assert "bob" not in loaded.users
+
+    def test_transaction_discarded_on_error(self, users_handler):
+        """Test that a failing transaction writes nothing."""
+        with pytest.raises(ValueError):
+            with users_handler.transaction():
+                users_handler.add_user(
+                    username="alice",
+                    email="alice@example.com",
+                    displayname="Alice",
+                    password_hash="$2b$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
+                    groups=["users"]
+                )
+                users_handler.delete_user("nobody")
+
+        assert "alice" not in users_handler.load_users().users
@@ -7,261 +7,117 @@ Tests:
 - Session management
 - Security headers
 """
+import asyncio
+import re
 import pytest
-from unittest.mock import Mock, AsyncMock
-from starlette.testclient import TestClient
-from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
-from app.config import Settings
-from app.security import SecurityMiddleware, extract_actor, extract_ip
+from unittest.mock import Mock, patch
+from starlette.datastructures import Address
+from itsdangerous import BadSignature
+from app.security import SecurityMiddleware, _parse_groups, extract_actor, extract_ip
 
 
-@pytest.fixture
-def settings():
-    """Create test settings."""
-    settings = Mock(spec=Settings)
-    settings.admin_group = "authelia-admins"
-    settings.csrf_secret = "test-secret-key-32-chars-long!!"
-    settings.session_ttl_minutes = 30
-    return settings
+STATE_CHANGING_METHODS = ["POST", "PUT", "PATCH", "DELETE"]
 
+# 1000 non-admin groups with the admin group last
+LARGE_GROUP_HEADER = ",".join([f"group{i}" for i in range(1000)] + ["authelia-admins"])
 
-class TestRBACEnforcement:
-    """Test RBAC via X-Forwarded-Groups."""
-
-    def test_rbac_allows_admin_group(self, settings):
-        """Requests with admin group should pass RBAC."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        response = client.post(
-            "/users",
-            headers={
-                "X-Forwarded-Groups": "authelia-admins,users",
-                "X-CSRF-Token": "test-token"
-            }
-        )
-
-        # Should not get 403 due to RBAC (may get 400 due to CSRF, but not 403)
-        assert response.status_code != 403 or "Admin group" not in response.json().get("detail", "")
-
-    def test_rbac_blocks_without_admin_group(self, settings):
-        """Requests without admin group should be blocked."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        response = client.post(
-            "/users",
-            headers={
-                "X-Forwarded-Groups": "users,developers",  # No admin group
-            }
-        )
-
-        assert response.status_code == 403
-        assert "Admin group" in response.json()["detail"]
-
-    def test_rbac_blocks_missing_header(self, settings):
-        """Requests without X-Forwarded-Groups should be blocked."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        response = client.post("/users")
-
-        assert response.status_code == 403
-        assert "Admin group" in response.json()["detail"]
-
-    def test_rbac_blocks_empty_header(self, settings):
-        """Requests with empty X-Forwarded-Groups should be blocked."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        response = client.post(
-            "/users",
-            headers={"X-Forwarded-Groups": ""}
-        )
+# Security headers every response must carry (exact values / present)
+EXPECTED_SECURITY_HEADERS = {
+    "x-frame-options": "DENY",
+    "referrer-policy": "no-referrer",
+    "x-content-type-options": "nosniff",
+}
+REQUIRED_SECURITY_HEADERS = {"content-security-policy", "strict-transport-security"}
 
-        assert response.status_code == 403
-        assert "Admin group" in response.json()["detail"]
+# Directives the CSP must contain, in any order (one lookahead per directive)
+CSP_REQUIRED_DIRECTIVES = re.compile(
+    r"(?=.*default-src 'self')(?=.*frame-ancestors 'none')", re.S
+)
 
-    def test_rbac_blocks_wrong_groups(self, settings):
-        """Requests with only wrong groups should be blocked."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
 
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
+class StubRequest:
+    """Just the request attributes extract_actor/extract_ip read."""
+    __slots__ = ("headers", "client")
 
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
+    def __init__(self, headers=None, client=None):
+        self.headers = headers or {}
+        self.client = client
 
-        client = TestClient(app)
 
-        response = client.post(
-            "/users",
-            headers={"X-Forwarded-Groups": "users,developers,viewers"}
-        )
-
-        assert response.status_code == 403
-        assert "Admin group" in response.json()["detail"]
-
-    def test_rbac_allows_mixed_groups_with_admin(self, settings):
-        """Requests with admin group among others should pass RBAC."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        # Include admin group among others
-        response = client.post(
-            "/users",
-            headers={
-                "X-Forwarded-Groups": "users,authelia-admins,developers"
-            }
-        )
-
-        # Should not get 403 due to RBAC (may get 400 due to CSRF, but not 403)
-        if response.status_code == 403:
-            assert "Admin group" not in response.json().get("detail", "")
-
-    def test_rbac_applies_to_delete_method(self, settings):
-        """DELETE requests should also require RBAC."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users/{username}", endpoint, methods=["DELETE"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        # Without admin group
-        response = client.delete(
-            "/users/testuser",
-            headers={"X-Forwarded-Groups": "users"}
-        )
-
-        assert response.status_code == 403
-        assert "Admin group" in response.json()["detail"]
-
-    def test_rbac_applies_to_put_method(self, settings):
-        """PUT requests should also require RBAC."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users/{username}", endpoint, methods=["PUT"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        # Without admin group
-        response = client.put(
-            "/users/testuser",
-            headers={"X-Forwarded-Groups": "users"}
-        )
-
-        assert response.status_code == 403
-        assert "Admin group" in response.json()["detail"]
-
-    def test_rbac_applies_to_patch_method(self, settings):
-        """PATCH requests should also require RBAC."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users/{username}", endpoint, methods=["PATCH"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
+class TestRBACEnforcement:
+    """Test RBAC via X-Forwarded-Groups."""
 
-        client = TestClient(app)
+    @pytest.mark.parametrize("groups_header, blocked", [
+        ("authelia-admins,users", False),
+        ("users,developers", True),
+        (None, True),
+        ("", True),
+        ("users,developers,viewers", True),
+        ("users,authelia-admins,developers", False),
+        ("users Authelia-Admins", False),
+    ], ids=[
+        "admin", "no-admin", "missing-header", "empty-header",
+        "wrong-groups", "mixed-with-admin", "case-insensitive",
+    ])
+    @pytest.mark.asyncio
+    async def test_rbac_admin_check(self, client, groups_header, blocked):
+        """Only requests carrying the admin group (any case, any position) pass RBAC."""
+        headers = {} if groups_header is None else {"X-Forwarded-Groups": groups_header}
+        response = await client.request("POST", "/users", headers=headers)
+
+        # Passing requests may still fail CSRF (400), but never RBAC (403)
+        assert (response.status_code == 403) == blocked
+        if blocked:
+            assert "Admin group" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_rbac_large_group_list(self, client):
+        """Admin group at the end of a 1000-group header should still pass RBAC."""
+        headers = {"X-Forwarded-Groups": LARGE_GROUP_HEADER}
+        response = await client.request("POST", "/users", headers=headers)
+
+        # Past RBAC; rejected by CSRF instead
+        assert response.status_code == 400
 
-        # Without admin group
-        response = client.patch(
-            "/users/testuser",
-            headers={"X-Forwarded-Groups": "users"}
+    @pytest.mark.asyncio
+    async def test_rbac_repeated_same_groups_is_cached(self, client):
+        """Repeated identical X-Forwarded-Groups values should be parsed once."""
+        headers = {"X-Forwarded-Groups": "users,authelia-admins,developers"}
+        _parse_groups.cache_clear()
+
+        responses = await asyncio.gather(*(
+            client.request("POST", "/users", headers=headers) for _ in range(10)
+        ))
+
+        # Past RBAC; rejected by CSRF instead
+        assert all(response.status_code == 400 for response in responses)
+        info = _parse_groups.cache_info()
+        assert (info.misses, info.hits) == (1, 9)
+
+    def test_parse_groups_separators_and_case(self):
+        """Commas, spaces and mixed case should all parse to the same groups."""
+        assert _parse_groups("Users, Authelia-Admins  developers,,") == frozenset(
+            {"users", "authelia-admins", "developers"}
         )
-
-        assert response.status_code == 403
-        assert "Admin group" in response.json()["detail"]
-
-    def test_rbac_allows_get_requests(self, settings):
+        assert _parse_groups("") == frozenset()
+
+    @pytest.mark.asyncio
+    async def test_rbac_blocks_non_admin(self, client):
+        """Every state-changing method should require the admin group."""
+        responses = await asyncio.gather(*(
+            client.request(method, "/users/testuser", headers={"X-Forwarded-Groups": "users"})
+            for method in STATE_CHANGING_METHODS
+        ))
+
+        for method, response in zip(STATE_CHANGING_METHODS, responses):
+            assert response.status_code == 403, method
+            assert "Admin group" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_rbac_allows_get_requests(self, client):
         """GET requests should not require RBAC check."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/", endpoint, methods=["GET"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
         # GET requests don't require admin group
-        response = client.get("/")
+        response = await client.request("GET", "/")
 
         # Should not be blocked by RBAC (may have other issues)
         assert response.status_code != 403 or "Admin group" not in str(response.content)
@@ -270,246 +126,157 @@ class TestRBACEnforcement:
 class TestCSRFProtection:
     """Test CSRF validation."""
 
-    def test_csrf_required_for_post(self, settings):
-        """POST requests should require valid CSRF token."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        # POST without CSRF token should fail
-        response = client.post(
-            "/users",
-            headers={
-                "X-Forwarded-Groups": "authelia-admins"
-            }
-        )
-
-        assert response.status_code == 400
-        assert "CSRF" in response.json()["error"]
-
-    def test_health_endpoint_bypasses_csrf(self, settings):
+    @pytest.mark.asyncio
+    async def test_csrf_required(self, client):
+        """State-changing requests should require a valid CSRF token."""
+        # Admin requests without CSRF token should fail
+        responses = await asyncio.gather(*(
+            client.request(method, "/users/testuser", headers={"X-Forwarded-Groups": "authelia-admins"})
+            for method in STATE_CHANGING_METHODS
+        ))
+
+        for method, response in zip(STATE_CHANGING_METHODS, responses):
+            assert response.status_code == 400, method
+            assert "CSRF" in response.json()["error"]
+
+    @pytest.mark.asyncio
+    async def test_health_endpoint_bypasses_csrf(self, client):
         """Health check endpoint should not require CSRF."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "OK"})
-
-        app = Starlette(routes=[
-            Route("/health", endpoint, methods=["GET"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        response = client.get("/health")
+        response = await client.request("GET", "/health")
 
         # Should succeed without CSRF
         assert response.status_code == 200
 
-    def test_csrf_required_for_delete(self, settings):
-        """DELETE requests should require valid CSRF token."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users/{username}", endpoint, methods=["DELETE"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        # DELETE without CSRF token should fail
-        response = client.delete(
-            "/users/testuser",
-            headers={"X-Forwarded-Groups": "authelia-admins"}
+    @pytest.mark.asyncio
+    async def test_csrf_missing_cookie(self, client):
+        """Requests with header but no cookie should fail."""
+        # POST with header but no cookie
+        response = await client.request(
+            "POST",
+            "/users",
+            headers={
+                "X-Forwarded-Groups": "authelia-admins",
+                "X-CSRF-Token": "some-token"
+            }
         )
 
         assert response.status_code == 400
         assert "CSRF" in response.json()["error"]
 
-    def test_csrf_required_for_put(self, settings):
-        """PUT requests should require valid CSRF token."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users/{username}", endpoint, methods=["PUT"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        # PUT without CSRF token should fail
-        response = client.put(
-            "/users/testuser",
+    @pytest.mark.asyncio
+    async def test_csrf_missing_header_and_form_field(self, client, csrf_token):
+        """Requests with cookie but no submitted token should fail."""
+        # POST with a valid cookie but no header or form field
+        client.cookies.set("csrf", csrf_token)
+        response = await client.request(
+            "POST",
+            "/users",
             headers={"X-Forwarded-Groups": "authelia-admins"}
         )
 
         assert response.status_code == 400
         assert "CSRF" in response.json()["error"]
 
-    def test_csrf_required_for_patch(self, settings):
-        """PATCH requests should require valid CSRF token."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
+    def test_csrf_cached_token_still_expires(self, settings, csrf_token):
+        """A token remembered by the verify cache must still honour max_age."""
+        middleware = SecurityMiddleware(Mock(), settings=settings)
+        token = csrf_token
 
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
+        assert middleware._load_csrf_token(token)[0] == "test-value"
+        assert token in middleware._csrf_verify_cache
 
-        app = Starlette(routes=[
-            Route("/users/{username}", endpoint, methods=["PATCH"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
+        # Age the cached entry past its expiry (signed at the epoch)
+        _, payload = middleware._csrf_verify_cache[token]
+        middleware._csrf_verify_cache[token] = (0.0, payload)
 
-        client = TestClient(app)
+        with patch.object(middleware.csrf_serializer, 'loads', side_effect=BadSignature("expired")):
+            with pytest.raises(BadSignature):
+                middleware._load_csrf_token(token)
 
-        # PATCH without CSRF token should fail
-        response = client.patch(
-            "/users/testuser",
-            headers={"X-Forwarded-Groups": "authelia-admins"}
-        )
 
-        assert response.status_code == 400
-        assert "CSRF" in response.json()["error"]
+class TestRBACPerformance:
+    """Benchmark the RBAC check path (pytest-benchmark)."""
 
-    def test_csrf_missing_cookie(self, settings):
-        """Requests with header but no cookie should fail."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
+    def test_rbac_large_group_list_perf(self, benchmark, client, event_loop):
+        """Time a request whose admin group is the last of 1000 groups."""
+        headers = {"X-Forwarded-Groups": LARGE_GROUP_HEADER}
 
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
-
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        # POST with header but no cookie
-        response = client.post(
-            "/users",
-            headers={
-                "X-Forwarded-Groups": "authelia-admins",
-                "X-CSRF-Token": "some-token"
-            }
+        response = benchmark(
+            lambda: event_loop.run_until_complete(client.request("POST", "/users", headers=headers))
         )
 
         assert response.status_code == 400
-        assert "CSRF" in response.json()["error"]
-
-    def test_csrf_missing_header_and_form_field(self, settings):
-        """Requests with cookie but no submitted token should fail."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-        from itsdangerous import URLSafeTimedSerializer
-
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
 
-        app = Starlette(routes=[
-            Route("/users", endpoint, methods=["POST"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
 
-        client = TestClient(app)
+class TestCSRFPerformance:
+    """Benchmark the CSRF check path (pytest-benchmark)."""
 
-        # Generate a valid CSRF token
-        serializer = URLSafeTimedSerializer(settings.csrf_secret, salt='csrf')
-        token = serializer.dumps("test-value")
+    def test_csrf_check_perf(self, benchmark, client, csrf_token, event_loop):
+        """Time an admin request that passes RBAC and the CSRF comparison."""
+        client.cookies.set("csrf", csrf_token)
+        headers = {"X-Forwarded-Groups": "authelia-admins", "X-CSRF-Token": csrf_token}
 
-        # POST with cookie but no header or form field
-        response = client.post(
-            "/users",
-            headers={"X-Forwarded-Groups": "authelia-admins"},
-            cookies={"csrf": token}
+        response = benchmark(
+            lambda: event_loop.run_until_complete(client.request("POST", "/users", headers=headers))
         )
 
-        assert response.status_code == 400
-        assert "CSRF" in response.json()["error"]
+        assert response.status_code == 200
 
 
+@pytest.mark.pure
 class TestActorExtraction:
     """Test actor (username) extraction."""
 
     def test_extract_actor_from_header(self):
         """Extract actor from X-Forwarded-User header."""
-        request = Mock(spec=Request)
-        request.headers = {"X-Forwarded-User": "testuser"}
+        request = StubRequest({"X-Forwarded-User": "testuser"})
 
         actor = extract_actor(request)
         assert actor == "testuser"
 
     def test_extract_actor_defaults_to_unknown(self):
         """Default to 'unknown' if header missing."""
-        request = Mock(spec=Request)
-        request.headers = {}
+        request = StubRequest()
 
         actor = extract_actor(request)
         assert actor == "unknown"
 
     def test_extract_actor_strips_whitespace(self):
         """Actor should be stripped of whitespace."""
-        request = Mock(spec=Request)
-        request.headers = {"X-Forwarded-User": "  testuser  "}
+        request = StubRequest({"X-Forwarded-User": "  testuser  "})
 
         actor = extract_actor(request)
         assert actor == "testuser"
 
 
+@pytest.mark.pure
 class TestIPExtraction:
     """Test IP address extraction."""
 
     def test_extract_ip_from_forwarded_for(self):
         """Extract IP from X-Forwarded-For (first in chain)."""
-        request = Mock(spec=Request)
-        request.headers = {"X-Forwarded-For": "192.168.1.100, 10.0.0.1"}
-        request.client = None
+        request = StubRequest({"X-Forwarded-For": "192.168.1.100, 10.0.0.1"})
 
         ip = extract_ip(request)
         assert ip == "192.168.1.100"
 
     def test_extract_ip_from_real_ip(self):
         """Extract IP from X-Real-IP if X-Forwarded-For missing."""
-        request = Mock(spec=Request)
-        request.headers = {"X-Real-IP": "192.168.1.200"}
-        request.client = None
+        request = StubRequest({"X-Real-IP": "192.168.1.200"})
 
         ip = extract_ip(request)
         assert ip == "192.168.1.200"
 
     def test_extract_ip_from_client(self):
         """Fallback to client.host if headers missing."""
-        request = Mock(spec=Request)
-        request.headers = {}
-        request.client = Mock()
-        request.client.host = "192.168.1.300"
+        request = StubRequest(client=Address("192.168.1.300", 12345))
 
         ip = extract_ip(request)
         assert ip == "192.168.1.300"
 
     def test_extract_ip_defaults_to_unknown(self):
         """Default to 'unknown' if all sources missing."""
-        request = Mock(spec=Request)
-        request.headers = {}
-        request.client = None
+        request = StubRequest()
 
         ip = extract_ip(request)
         assert ip == "unknown"
@@ -518,50 +285,20 @@ class TestIPExtraction:
 class TestSecurityHeaders:
     """Test security headers are added to responses."""
 
-    def test_security_headers_present(self, settings):
+    @pytest.mark.asyncio
+    async def test_security_headers_present(self, client):
         """Security headers should be added to all responses."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
+        response = await client.request("GET", "/")
 
-        async def endpoint(request: Request):
-            return JSONResponse({"status": "ok"})
+        # Check for security headers (one comparison reports every mismatch)
+        headers = {name.lower(): value for name, value in response.headers.items()}
+        assert EXPECTED_SECURITY_HEADERS.items() <= headers.items()
+        assert REQUIRED_SECURITY_HEADERS <= headers.keys()
 
-        app = Starlette(routes=[
-            Route("/", endpoint, methods=["GET"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        response = client.get("/")
-
-        # Check for security headers
-        assert "Content-Security-Policy" in response.headers
-        assert "X-Frame-Options" in response.headers
-        assert response.headers["X-Frame-Options"] == "DENY"
-        assert "Referrer-Policy" in response.headers
-        assert response.headers["Referrer-Policy"] == "no-referrer"
-        assert "Strict-Transport-Security" in response.headers
-        assert "X-Content-Type-Options" in response.headers
-        assert response.headers["X-Content-Type-Options"] == "nosniff"
-
-    def test_csp_header_restricts_sources(self, settings):
+    @pytest.mark.asyncio
+    async def test_csp_header_restricts_sources(self, client):
         """CSP header should restrict sources to 'self'."""
-        from starlette.applications import Starlette
-        from starlette.routing import Route
-
-        async def endpoint(request: Request):
-            return Response("ok")
-
-        app = Starlette(routes=[
-            Route("/", endpoint, methods=["GET"])
-        ])
-        app.add_middleware(SecurityMiddleware, settings=settings)
-
-        client = TestClient(app)
-
-        response = client.get("/")
+        response = await client.request("GET", "/")
 
         csp = response.headers["Content-Security-Policy"]
-        assert "default-src 'self'" in csp
-        assert "frame-ancestors 'none'" in csp
+        assert CSP_REQUIRED_DIRECTIVES.match(csp), csp
@@ -7,57 +7,71 @@ Tests:
 - Group normalization
 - Password hash validation
 """
+from typing import List
+
 import pytest
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 from app.models import UserConfig, CreateUserRequest, UsersFile
 
+# Validates a whole list of requests in one call
+CREATE_REQUESTS = TypeAdapter(List[CreateUserRequest])
+
+VALID_USERNAMES = [
+    "ab",  # Minimum 2 chars
+    "user123",
+    "john.doe",
+    "jane_smith",
+    "test-user",
+    "a1b2c3",
+]
+
+VALID_EMAILS = [
+    "user@example.com",
+    "john.doe@company.co.uk",
+    "test+tag@domain.org",
+]
+
 
 class TestUsernameValidation:
     """Test username validation rules."""
 
     def test_valid_usernames(self):
         """Valid usernames should pass."""
-        valid_usernames = [
-            "ab",  # Minimum 2 chars
-            "user123",
-            "john.doe",
-            "jane_smith",
-            "test-user",
-            "a1b2c3",
-        ]
-
-        for username in valid_usernames:
-            request = CreateUserRequest(
+        requests = CREATE_REQUESTS.validate_python([
+            {
+                "username": username,
+                "email": "test@example.com",
+                "displayname": "Test User",
+                "password": "SecurePassword123!"
+            }
+            for username in VALID_USERNAMES
+        ])
+        assert [r.username for r in requests] == [u.lower() for u in VALID_USERNAMES]
+
+    @pytest.mark.parametrize("username", [
+        "a",  # Too short
+        pytest.param(
+            "UPPERCASE",
+            marks=pytest.mark.xfail(reason="CreateUserRequest lowercases usernames")
+        ),
+        ".startsdot",  # Starts with dot
+        "endsdot.",  # Ends with dot
+        "_startsunderscore",  # Starts with underscore
+        "endsunderscore_",  # Ends with underscore
+        "-startshyphen",  # Starts with hyphen
+        "endshyphen-",  # Ends with hyphen
+        "has spaces",  # Contains spaces
+        "special!chars",  # Invalid special chars
+    ])
+    def test_invalid_usernames(self, username):
+        """Invalid usernames should fail."""
+        with pytest.raises(ValidationError):
+            CreateUserRequest(
                 username=username,
                 email="test@example.com",
                 displayname="Test User",
                 password="SecurePassword123!"
             )
-            assert request.username == username.lower()
-
-    def test_invalid_usernames(self):
-        """Invalid usernames should fail."""
-        invalid_usernames = [
-            "a",  # Too short
-            "UPPERCASE",  # Will be lowercased but test expects rejection
-            ".startsdot",  # Starts with dot
-            "endsdot.",  # Ends with dot
-            "_startsunderscore",  # Starts with underscore
-            "endsunderscore_",  # Ends with underscore
-            "-startshyphen",  # Starts with hyphen
-            "endshyphen-",  # Ends with hyphen
-            "has spaces",  # Contains spaces
-            "special!chars",  # Invalid special chars
-        ]
-
-        for username in invalid_usernames:
-            with pytest.raises(ValidationError):
-                CreateUserRequest(
-                    username=username,
-                    email="test@example.com",
-                    displayname="Test User",
-                    password="SecurePassword123!"
-                )
 
     def test_username_normalization(self):
         """Usernames should be normalized to lowercase."""
@@ -75,39 +89,35 @@ class TestEmailValidation:
 
     def test_valid_emails(self):
         """Valid emails should pass."""
-        valid_emails = [
-            "user@example.com",
-            "john.doe@company.co.uk",
-            "test+tag@domain.org",
-        ]
-
-        for email in valid_emails:
-            request = CreateUserRequest(
+        requests = CREATE_REQUESTS.validate_python([
+            {
+                "username": "testuser",
+                "email": email,
+                "displayname": "Test User",
+                "password": "SecurePassword123!"
+            }
+            for email in VALID_EMAILS
+        ])
+        assert [r.email for r in requests] == [e.lower() for e in VALID_EMAILS]
+
+    @pytest.mark.parametrize("email", [
+        "",
+        "notanemail",
+        "@nodomain.com",
+        "noat.com",
+        "no@domain",
+        "two@at@signs.com",
+        "a" * 250 + "@example.com",  # Over 254 chars
+    ])
+    def test_invalid_emails(self, email):
+        """Invalid emails should fail."""
+        with pytest.raises(ValidationError):
+            CreateUserRequest(
                 username="testuser",
                 email=email,
                 displayname="Test User",
                 password="SecurePassword123!"
             )
-            assert request.email == email.lower()
-
-    def test_invalid_emails(self):
-        """Invalid emails should fail."""
-        invalid_emails = [
-            "",
-            "notanemail",
-            "@nodomain.com",
-            "noat.com",
-            "no@domain",
-        ]
-
-        for email in invalid_emails:
-            with pytest.raises(ValidationError):
-                CreateUserRequest(
-                    username="testuser",
-                    email=email,
-                    displayname="Test User",
-                    password="SecurePassword123!"
-                )
 
     def test_email_normalization(self):
         """Emails should be normalized to lowercase."""
@@ -155,40 +165,36 @@ class TestGroupValidation:
 class TestPasswordHashValidation:
     """Test password hash validation."""
 
-    def test_valid_bcrypt_hashes(self):
+    @pytest.mark.parametrize("hash_value", [
+        "$2a$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
+        "$2b$10$xyzabcdefghijklmnopqrstuvwxyz123456789012345678",
+        "$2y$12$1234567890abcdefghijklmnopqrstuvwxyz123456789012",
+    ])
+    def test_valid_bcrypt_hashes(self, hash_value):
         """Valid bcrypt hashes should pass."""
-        valid_hashes = [
-            "$2a$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
-            "$2b$10$xyzabcdefghijklmnopqrstuvwxyz123456789012345678",
-            "$2y$12$1234567890abcdefghijklmnopqrstuvwxyz123456789012",
-        ]
-
-        for hash_value in valid_hashes:
-            config = UserConfig(
+        config = UserConfig(
+            password=hash_value,
+            displayname="Test User",
+            email="test@example.com",
+            groups=[]
+        )
+        assert config.password == hash_value
+
+    @pytest.mark.parametrize("hash_value", [
+        "",
+        "plaintext",
+        "$2x$12$invalid",  # Invalid variant
+        "tooshort",
+    ])
+    def test_invalid_password_hashes(self, hash_value):
+        """Invalid password hashes should fail."""
+        with pytest.raises(ValidationError):
+            UserConfig(
                 password=hash_value,
                 displayname="Test User",
                 email="test@example.com",
                 groups=[]
             )
-            assert config.password == hash_value
-
-    def test_invalid_password_hashes(self):
-        """Invalid password hashes should fail."""
-        invalid_hashes = [
-            "",
-            "plaintext",
-            "$2x$12$invalid",  # Invalid variant
-            "tooshort",
-        ]
-
-        for hash_value in invalid_hashes:
-            with pytest.raises(ValidationError):
-                UserConfig(
-                    password=hash_value,
-                    displayname="Test User",
-                    email="test@example.com",
-                    groups=[]
-                )
 
 
 class TestPasswordValidation:
@@ -228,24 +234,9 @@ class TestPasswordValidation:
 class TestUsersFileValidation:
     """Test UsersFile validation."""
 
-    def test_valid_users_file(self):
+    def test_valid_users_file(self, alice_config, bob_config):
         """Valid users file should pass validation."""
-        users_data = {
-            "alice": UserConfig(
-                password="$2b$12$abcdefghijklmnopqrstuvwxyz123456789012345678901",
-                displayname="Alice",
-                email="alice@example.com",
-                groups=["users"]
-            ),
-            "bob": UserConfig(
-                password="$2b$12$xyzabcdefghijklmnopqrstuvwxyz123456789012345678",
-                displayname="Bob",
-                email="bob@example.com",
-                groups=["admins"]
-            )
-        }
-
-        users_file = UsersFile(users=users_data)
+        users_file = UsersFile(users={"alice": alice_config, "bob": bob_config})
         assert len(users_file.users) == 2
 
     def test_invalid_username_in_file(self):
@@ -4,130 +4,118 @@ Unit tests for watch mode detection and conditional restart logic.
 import pytest
 import tempfile
 from pathlib import Path
-from unittest.mock import Mock, AsyncMock, patch
-import yaml
+from unittest.mock import patch
 
 from app.authelia_config import AutheliaConfigParser, detect_watch_mode
 from app.config import Settings
+from app.restart import apply_changes
+
+# Static configs, serialized once: only parsing is under test
+CFG_WATCH_ENABLED = (
+    "authentication_backend:\n"
+    "  file:\n"
+    "    path: /config/users.yml\n"
+    "    watch: true\n"
+)
+CFG_WATCH_DISABLED = (
+    "authentication_backend:\n"
+    "  file:\n"
+    "    path: /config/users.yml\n"
+    "    watch: false\n"
+)
+CFG_WATCH_MISSING = (
+    "authentication_backend:\n"
+    "  file:\n"
+    "    path: /config/users.yml\n"
+)
+CFG_LDAP_ONLY = (
+    "authentication_backend:\n"
+    "  ldap:\n"
+    "    url: ldap://localhost\n"
+)
+CFG_INVALID = "invalid: yaml: content:\n  - broken"
+
+
+def _write_config(tmp_path_factory, text):
+    """Write text to a fresh configuration.yml and return its path."""
+    config_file = tmp_path_factory.mktemp("cfg") / "configuration.yml"
+    config_file.write_text(text)
+    return config_file
+
+
+@pytest.fixture(scope="module")
+def watch_enabled_cfg(tmp_path_factory):
+    """Config with the file backend and watch enabled."""
+    return _write_config(tmp_path_factory, CFG_WATCH_ENABLED)
+
+
+@pytest.fixture(scope="module")
+def watch_disabled_cfg(tmp_path_factory):
+    """Config with the file backend and watch disabled."""
+    return _write_config(tmp_path_factory, CFG_WATCH_DISABLED)
+
+
+@pytest.fixture(scope="module")
+def watch_missing_cfg(tmp_path_factory):
+    """Config with the file backend but no watch key."""
+    return _write_config(tmp_path_factory, CFG_WATCH_MISSING)
+
+
+@pytest.fixture(scope="module")
+def ldap_only_cfg(tmp_path_factory):
+    """Config without a file backend."""
+    return _write_config(tmp_path_factory, CFG_LDAP_ONLY)
+
+
+@pytest.fixture(scope="module")
+def invalid_cfg(tmp_path_factory):
+    """File that is not valid YAML."""
+    return _write_config(tmp_path_factory, CFG_INVALID)
 
 
 class TestWatchModeDetection:
     """Test watch mode detection from configuration file."""
 
-    def test_detect_watch_mode_enabled(self, tmp_path):
+    def test_detect_watch_mode_enabled(self, watch_enabled_cfg):
         """Test detection when watch mode is enabled."""
-        config_file = tmp_path / "configuration.yml"
-
-        # Create config with watch enabled
-        config_data = {
-            'authentication_backend': {
-                'file': {
-                    'path': '/config/users.yml',
-                    'watch': True
-                }
-            }
-        }
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
-
-        # Test detection
-        parser = AutheliaConfigParser(str(config_file))
+        parser = AutheliaConfigParser(str(watch_enabled_cfg))
         assert parser.is_watch_mode_enabled() is True
 
-    def test_detect_watch_mode_disabled(self, tmp_path):
+    def test_detect_watch_mode_disabled(self, watch_disabled_cfg):
         """Test detection when watch mode is disabled."""
-        config_file = tmp_path / "configuration.yml"
-
-        # Create config with watch disabled
-        config_data = {
-            'authentication_backend': {
-                'file': {
-                    'path': '/config/users.yml',
-                    'watch': False
-                }
-            }
-        }
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
-
-        # Test detection
-        parser = AutheliaConfigParser(str(config_file))
+        parser = AutheliaConfigParser(str(watch_disabled_cfg))
         assert parser.is_watch_mode_enabled() is False
 
-    def test_detect_watch_mode_missing(self, tmp_path):
+    def test_detect_watch_mode_missing(self, watch_missing_cfg):
         """Test detection when watch key is missing (defaults to False)."""
-        config_file = tmp_path / "configuration.yml"
-
-        # Create config without watch key
-        config_data = {
-            'authentication_backend': {
-                'file': {
-                    'path': '/config/users.yml'
-                }
-            }
-        }
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
-
-        # Test detection
-        parser = AutheliaConfigParser(str(config_file))
+        parser = AutheliaConfigParser(str(watch_missing_cfg))
         assert parser.is_watch_mode_enabled() is False
 
-    def test_detect_watch_mode_no_file_backend(self, tmp_path):
+    def test_detect_watch_mode_no_file_backend(self, ldap_only_cfg):
         """Test detection when file backend is not configured."""
-        config_file = tmp_path / "configuration.yml"
-
-        # Create config without file backend
-        config_data = {
-            'authentication_backend': {
-                'ldap': {
-                    'url': 'ldap://localhost'
-                }
-            }
-        }
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
-
-        # Test detection
-        parser = AutheliaConfigParser(str(config_file))
+        parser = AutheliaConfigParser(str(ldap_only_cfg))
         assert parser.is_watch_mode_enabled() is False
 
+    def test_detect_watch_mode_without_watch_key_skips_parse(self, ldap_only_cfg):
+        """A config that never mentions watch is not YAML-parsed at all."""
+        with patch('app.authelia_config._load_config_cached') as mock_load:
+            parser = AutheliaConfigParser(str(ldap_only_cfg))
+            assert parser.is_watch_mode_enabled() is False
+            mock_load.assert_not_called()
+
     def test_detect_watch_mode_file_not_found(self):
         """Test detection when config file doesn't exist."""
         parser = AutheliaConfigParser("/nonexistent/config.yml")
         assert parser.is_watch_mode_enabled() is False
 
-    def test_detect_watch_mode_invalid_yaml(self, tmp_path):
+    def test_detect_watch_mode_invalid_yaml(self, invalid_cfg):
         """Test detection with invalid YAML."""
-        config_file = tmp_path / "configuration.yml"
-
-        with open(config_file, 'w') as f:
-            f.write("invalid: yaml: content:\n  - broken")
-
-        parser = AutheliaConfigParser(str(config_file))
+        parser = AutheliaConfigParser(str(invalid_cfg))
         assert parser.is_watch_mode_enabled() is False
 
-    def test_get_watch_config(self, tmp_path):
+    def test_get_watch_config(self, watch_enabled_cfg):
         """Test getting full watch configuration."""
-        config_file = tmp_path / "configuration.yml"
-
-        config_data = {
-            'authentication_backend': {
-                'file': {
-                    'path': '/config/users.yml',
-                    'watch': True
-                }
-            }
-        }
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
-
-        parser = AutheliaConfigParser(str(config_file))
+        parser = AutheliaConfigParser(str(watch_enabled_cfg))
         watch_config = parser.get_watch_config()
 
         assert watch_config['watch'] is True
@@ -136,143 +124,114 @@ class TestWatchModeDetection:
     def test_reload_config(self, tmp_path):
         """Test config reload functionality."""
         config_file = tmp_path / "configuration.yml"
-
-        # Initial config
-        config_data = {
-            'authentication_backend': {
-                'file': {
-                    'path': '/config/users.yml',
-                    'watch': False
-                }
-            }
-        }
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
+        config_file.write_text(CFG_WATCH_DISABLED)
 
         parser = AutheliaConfigParser(str(config_file))
         assert parser.is_watch_mode_enabled() is False
 
         # Update config
-        config_data['authentication_backend']['file']['watch'] = True
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
+        config_file.write_text(CFG_WATCH_ENABLED)
 
         # Reload and verify
         parser.reload_config()
         assert parser.is_watch_mode_enabled() is True
 
-    def test_helper_function(self, tmp_path):
+    def test_helper_function(self, watch_enabled_cfg):
         """Test the detect_watch_mode helper function."""
+        assert detect_watch_mode(str(watch_enabled_cfg)) is True
+
+    def test_helper_function_reuses_result_until_file_changes(self, tmp_path):
+        """Repeated detect_watch_mode calls skip parsing while the file is unchanged."""
         config_file = tmp_path / "configuration.yml"
+        config_file.write_text(CFG_WATCH_ENABLED)
+        assert detect_watch_mode(str(config_file)) is True
 
-        config_data = {
-            'authentication_backend': {
-                'file': {
-                    'watch': True
-                }
-            }
-        }
+        with patch('app.authelia_config.AutheliaConfigParser') as mock_parser:
+            assert detect_watch_mode(str(config_file)) is True
+            mock_parser.assert_not_called()
 
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
+        config_file.write_text(CFG_WATCH_DISABLED)
+        assert detect_watch_mode(str(config_file)) is False
 
-        assert detect_watch_mode(str(config_file)) is True
+
+@pytest.fixture
+def base_settings(tmp_path):
+    """Real Settings built with model_construct: no env lookup, no validators."""
+    return Settings.model_construct(
+        force_restart=False,
+        restart_cmd='echo "restart"',
+        health_url='http://localhost:9091/api/health',
+        health_timeout_seconds=5,
+        watch_mode_timeout=5,
+        authelia_config_file=str(tmp_path / "configuration.yml"),
+    )
+
+
+class AsyncStub:
+    """Async stand-in that counts its calls and returns a fixed result."""
+
+    def __init__(self, result=None):
+        self.result = result
+        self.calls = 0
+
+    async def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.result
 
 
 class TestConditionalRestart:
     """Test conditional restart logic based on watch mode."""
 
     @pytest.mark.asyncio
-    async def test_apply_changes_with_force_restart(self):
+    async def test_apply_changes_with_force_restart(self, base_settings, monkeypatch):
         """Test that FORCE_RESTART=true always restarts."""
-        from app.restart import apply_changes
-
-        settings = Mock(spec=Settings)
+        settings = base_settings
         settings.force_restart = True
-        settings.restart_cmd = 'echo "restart"'
-        settings.health_url = 'http://localhost:9091/api/health'
-        settings.health_timeout_seconds = 5
 
-        # Mock restart_authelia to avoid actual restart
-        with patch('app.restart.restart_authelia', new_callable=AsyncMock) as mock_restart:
-            mock_restart.return_value = (True, "Restarted")
+        # Stub restart_authelia to avoid actual restart
+        restart = AsyncStub((True, "Restarted"))
+        monkeypatch.setattr('app.restart.restart_authelia', restart)
 
-            success, message = await apply_changes(settings)
+        success, message = await apply_changes(settings)
 
-            # Should call restart even if watch mode is enabled
-            mock_restart.assert_called_once()
-            assert success is True
+        # Should call restart even if watch mode is enabled
+        assert restart.calls == 1
+        assert success is True
 
     @pytest.mark.asyncio
-    async def test_apply_changes_watch_mode_enabled(self, tmp_path):
+    async def test_apply_changes_watch_mode_enabled(self, base_settings, watch_enabled_cfg,
+                                                    monkeypatch):
         """Test that watch mode enabled skips restart."""
-        from app.restart import apply_changes
+        settings = base_settings
+        settings.authelia_config_file = str(watch_enabled_cfg)
 
-        # Create config with watch enabled
-        config_file = tmp_path / "configuration.yml"
-        config_data = {
-            'authentication_backend': {
-                'file': {
-                    'watch': True
-                }
-            }
-        }
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
-
-        settings = Mock(spec=Settings)
-        settings.force_restart = False
-        settings.authelia_config_file = str(config_file)
-        settings.watch_mode_timeout = 5
-        settings.health_url = 'http://localhost:9091/api/health'
-
-        # Mock both restart and watch wait
-        with patch('app.restart.restart_authelia', new_callable=AsyncMock) as mock_restart, \
-             patch('app.restart.wait_for_watch_mode_reload', new_callable=AsyncMock) as mock_watch:
-            mock_watch.return_value = (True, "Watch mode applied")
-
-            success, message = await apply_changes(settings)
-
-            # Should NOT call restart
-            mock_restart.assert_not_called()
-            # Should call watch wait
-            mock_watch.assert_called_once()
-            assert success is True
+        # Stub both restart and watch wait
+        restart = AsyncStub()
+        watch = AsyncStub((True, "Watch mode applied"))
+        monkeypatch.setattr('app.restart.restart_authelia', restart)
+        monkeypatch.setattr('app.restart.wait_for_watch_mode_reload', watch)
+
+        success, message = await apply_changes(settings)
+
+        # Should NOT call restart
+        assert restart.calls == 0
+        # Should call watch wait
+        assert watch.calls == 1
+        assert success is True
 
     @pytest.mark.asyncio
-    async def test_apply_changes_watch_mode_disabled(self, tmp_path):
+    async def test_apply_changes_watch_mode_disabled(self, base_settings, watch_disabled_cfg,
+                                                     monkeypatch):
         """Test that watch mode disabled triggers restart."""
-        from app.restart import apply_changes
+        settings = base_settings
+        settings.authelia_config_file = str(watch_disabled_cfg)
 
-        # Create config with watch disabled
-        config_file = tmp_path / "configuration.yml"
-        config_data = {
-            'authentication_backend': {
-                'file': {
-                    'watch': False
-                }
-            }
-        }
-
-        with open(config_file, 'w') as f:
-            yaml.dump(config_data, f)
-
-        settings = Mock(spec=Settings)
-        settings.force_restart = False
-        settings.authelia_config_file = str(config_file)
-        settings.restart_cmd = 'echo "restart"'
-        settings.health_url = 'http://localhost:9091/api/health'
-        settings.health_timeout_seconds = 5
-
-        # Mock restart
-        with patch('app.restart.restart_authelia', new_callable=AsyncMock) as mock_restart:
-            mock_restart.return_value = (True, "Restarted")
-
-            success, message = await apply_changes(settings)
-
-            # Should call restart
-            mock_restart.assert_called_once()
-            assert success is True
+        # Stub restart
+        restart = AsyncStub((True, "Restarted"))
+        monkeypatch.setattr('app.restart.restart_authelia', restart)
+
+        success, message = await apply_changes(settings)
+
+        # Should call restart
+        assert restart.calls == 1
+        assert success is True